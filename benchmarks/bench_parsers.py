@@ -0,0 +1,68 @@
+"""
+Timings of each block parser, of a whole parse, of the CLI serialization and
+of the detection of the key events.
+"""
+
+import io
+
+import pytest
+
+from otdr.analysis import detect_events
+from otdr.block_parsers import MapBlockParser
+from otdr.buffer_reader import BufferReader
+from otdr.cli import serialize
+from otdr.encoder import blocks_to_plain
+from otdr.file_parser import ParserFactory
+
+READERS = {"file": io.BytesIO, "buffer": BufferReader}
+
+
+@pytest.fixture(params=list(READERS))
+def reader(request):
+    return READERS[request.param]
+
+
+def bench_map_block(benchmark, sor_bytes, reader):
+    fh = reader(sor_bytes)
+    offset = 4 if sor_bytes.startswith(b"Map\0") else 0
+    benchmark(lambda: MapBlockParser(fh, offset).parse())
+
+
+@pytest.mark.parametrize(
+    "block_name", ["GenParams", "SupParams", "KeyEvents", "DataPts", "Cksum"]
+)
+def bench_block_parser(benchmark, sor_bytes, reader, block_name):
+    sor = ParserFactory.create_parser(sor_bytes)
+    block = next(b for b in sor.map_block.blocks if b.name == block_name)
+    parser_class = type(sor.blocks.parsers[block_name])
+    fh = reader(sor_bytes)
+    benchmark(lambda: parser_class(fh, block.position).parse())
+
+
+@pytest.mark.parametrize("mode", ["file", "buffer", "mmap"])
+def bench_parse(benchmark, sor_bytes, tmp_path, mode):
+    sor_file = tmp_path / "bench.sor"
+    sor_file.write_bytes(sor_bytes)
+    source = sor_bytes if mode == "buffer" else sor_file
+
+    def parse():
+        with ParserFactory.create_parser(source, mode == "mmap") as parser:
+            return parser.parse()
+
+    benchmark(parse)
+
+
+@pytest.mark.parametrize("output_format", ["JSON", "CBOR", "XML"])
+def bench_serialize(benchmark, sor_bytes, output_format):
+    blocks = ParserFactory.create_parser(sor_bytes).parse()
+    benchmark(lambda: serialize(blocks_to_plain(blocks, True), output_format))
+
+
+def bench_detect_events(benchmark, sor_bytes):
+    sor = ParserFactory.create_parser(sor_bytes)
+    data_points, fxd_params, gen_params = (
+        sor["DataPts"],
+        sor["FxdParams"],
+        sor["GenParams"],
+    )
+    benchmark(lambda: detect_events(data_points, fxd_params, gen_params))
@@ -0,0 +1,24 @@
+"""
+Fixtures for the benchmarks: the sample files of data/ and synthetic v2 files
+scaled up to stress the hot paths (number of points and of key events).
+
+Run with `pytest benchmarks`.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from otdr.generator import random_sor
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+SAMPLE_FILES = ["demo_ab.sor", "M200_Sample_005_S13.sor", "sample1310_lowDR.sor"]
+# (number of points, number of key events)
+SYNTHETIC_SIZES = {"16k-10": (16000, 10), "256k-1000": (256000, 1000)}
+
+
+@pytest.fixture(scope="session", params=SAMPLE_FILES + list(SYNTHETIC_SIZES), ids=str)
+def sor_bytes(request) -> bytes:
+    if request.param in SYNTHETIC_SIZES:
+        return random_sor(*SYNTHETIC_SIZES[request.param], seed=0)
+    return (DATA_DIR / request.param).read_bytes()
@@ -1 +1,9 @@
+from .aio import AsyncParser
+from .analysis import detect_events
+from .block_parsers import ParserRegistry, ProprietaryBlockParser
+from .cache import ParseCache
+from .decimation import Decimation, DecimationMethod
 from .file_parser import ParserFactory, SorParserV1, SorParserV2
+from .metadata import SorMetadata, scan_metadata
+from .stream import StreamParser
+from .trace import trace_xy
@@ -0,0 +1,131 @@
+"""
+asyncio API: parse sor files received from async sources (uploads, object
+stores) without blocking the event loop. The decoding runs in an executor, at
+most `concurrency` parses at once so a burst of uploads can't take all the
+workers.
+"""
+
+import asyncio
+import mmap
+from concurrent.futures import Executor
+from typing import Any, AsyncIterable, Callable, List, Optional, Union
+
+from otdr.block_data_structure import BaseBlockData, MapBlock, detached
+from otdr.block_parsers import ChecksumMode
+from otdr.buffer_reader import BytesLike
+from otdr.decimation import Decimation
+from otdr.file_parser import BaseSorParser, ParserFactory
+
+AsyncSource = Union[BytesLike, AsyncIterable[bytes], Any]
+
+
+async def read_source(source: AsyncSource) -> BytesLike:
+    """
+    Content of a source: a bytes-like object, an object with an async
+    `read()` (aiohttp request content, aiofiles...) or an async iterable of
+    chunks.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        return source
+    if hasattr(source, "read"):
+        return await source.read()
+    return b"".join([chunk async for chunk in source])
+
+
+def parse_bytes(
+    data: BytesLike,
+    checksum: ChecksumMode = ChecksumMode.lazy,
+    decimation: Optional[Decimation] = None,
+) -> List[BaseBlockData]:
+    """
+    All the blocks of a file in memory. A function of the module, and the
+    blocks are detached from `data`, so that it can run in a process pool.
+    """
+    parser = ParserFactory.create_parser(data, False, checksum, decimation)
+    return [detached(block) for block in parser.parse()]
+
+
+class AsyncSorFile:
+    """
+    A file opened with `AsyncParser.open`: blocks are parsed on demand with
+    `await sor_file.get("KeyEvents")`, one at a time since they share the file.
+    """
+
+    parser: BaseSorParser
+
+    def __init__(self, parser: BaseSorParser, runner: "AsyncParser"):
+        self.parser = parser
+        self._runner = runner
+        self._lock = asyncio.Lock()
+
+    @property
+    def version(self) -> int:
+        return self.parser.version
+
+    @property
+    def map_block(self) -> MapBlock:
+        return self.parser.map_block
+
+    def __contains__(self, block_name: str) -> bool:
+        return block_name in self.parser.blocks
+
+    async def get(self, block_name: str) -> BaseBlockData:
+        parsed = self.parser.blocks.parsed
+        if block_name in parsed:
+            return parsed[block_name]
+        async with self._lock:
+            return await self._runner.run(self.parser.__getitem__, block_name)
+
+    async def parse(self) -> List[BaseBlockData]:
+        async with self._lock:
+            return await self._runner.run(self.parser.parse)
+
+
+class AsyncParser:
+    """
+    Run the parses in `executor` (the default executor of the loop if None).
+    `parse` can use a process pool, `open` needs threads: the blocks are
+    parsed one by one on the same parser.
+    """
+
+    executor: Optional[Executor]
+    concurrency: int
+    checksum: ChecksumMode
+    decimation: Optional[Decimation]
+
+    def __init__(
+        self,
+        executor: Optional[Executor] = None,
+        concurrency: int = 4,
+        checksum: ChecksumMode = ChecksumMode.lazy,
+        decimation: Optional[Decimation] = None,
+    ):
+        self.executor = executor
+        self.concurrency = concurrency
+        self.checksum = ChecksumMode(checksum)
+        self.decimation = decimation
+        self._semaphore = None  # bound to the running loop, see run
+
+    async def run(self, func: Callable, *args):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+
+    async def parse(self, source: AsyncSource) -> List[BaseBlockData]:
+        """
+        All the blocks of the file, like `ParserFactory.create_parser().parse()`.
+        """
+        data = await read_source(source)
+        return await self.run(parse_bytes, data, self.checksum, self.decimation)
+
+    async def open(self, source: AsyncSource) -> AsyncSorFile:
+        """
+        Parse the map block (and the checksum in strict mode) only.
+        """
+        data = await read_source(source)
+        parser = await self.run(
+            ParserFactory.create_parser, data, False, self.checksum, self.decimation
+        )
+        return AsyncSorFile(parser, self)
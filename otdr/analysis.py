@@ -0,0 +1,452 @@
+"""
+Find the key events of a trace from its DataPts points, for files whose event
+table is missing or not trusted. Needs numpy, every step is vectorized over
+the points; only the few events are looped on.
+
+The trace is smoothed over about a pulse width (`g` points), then:
+
+- reflections: points higher than the fiber on both sides (`g` points before
+  and after), reflective events if higher than a `refl_threshold` reflection.
+- non-reflective events: steps between the fiber `g` points before and after
+  a point, fiber attenuation removed, larger than `loss_threshold`.
+- end of fiber: the first point from which the whole trace stays more than
+  `EOT_threshold` below the fiber before it. Without one, the fiber stops
+  where the trace is clipped at the lowest power, if it is.
+
+Thresholds are those of FxdParams, raised to 5 times the noise of the trace
+(estimated from median absolute deviations). Slope and splice loss come from
+least-squares lines fitted on the fiber sections between events, with prefix
+sums: each fit is O(1).
+
+Distances are relative to the launch, at the user offset of GenParams.
+"""
+
+import logging
+import math
+from typing import List, NamedTuple, Optional, Tuple
+
+from otdr.block_data_structure import (
+    DataPoints,
+    EventDataType,
+    EventModeType,
+    EventTable,
+    EventType,
+    FxdParams,
+    GenParams,
+    KeyEvents,
+    KeyEventSummary,
+)
+from otdr.block_parsers.key_events import distance_factor
+from otdr.trace import trace_db
+from otdr.type_parser import numpy
+
+logger = logging.getLogger("pyOTDR")
+
+MIN_WINDOW = 3
+# thresholds are at least this many times the noise, so noise isn't an event
+NOISE_FACTOR = 5
+# windows after the origin searched for the front panel reflection
+LAUNCH_WINDOWS = 2
+# points of the blocks of the search of the end of fiber
+EOF_BLOCK = 64
+# medians are estimated on this many points
+STATISTICS_SAMPLES = 2048
+REFLECTIVE = EventDataType("1F9999LS", EventType.reflection, EventModeType.F)
+NON_REFLECTIVE = EventDataType("0F9999LS", EventType.loss_drop_gain, EventModeType.F)
+END_REFLECTIVE = EventDataType("1E9999LS", EventType.reflection, EventModeType.E)
+END_NON_REFLECTIVE = EventDataType(
+    "0E9999LS", EventType.loss_drop_gain, EventModeType.E
+)
+
+
+class _Event(NamedTuple):
+    index: int  # start of the event
+    peak: int
+    end: int  # the fiber after the event starts here
+    height: float  # of the reflection in dB, 0 if non-reflective
+
+
+def window_size(fxd_params: FxdParams) -> int:
+    """
+    Points in a pulse width, the smallest distance between two events.
+    """
+    sample_spacing_ns = fxd_params.sample_spacing.value * 1000
+    return max(MIN_WINDOW, round(fxd_params.pulse_width.value / sample_spacing_ns))
+
+
+def _prefix_sums(values):
+    sums = numpy.empty(len(values) + 1)
+    sums[0] = 0.0
+    numpy.cumsum(values, out=sums[1:])
+    return sums
+
+
+def smooth(values, window: int, cumsum=None):
+    """
+    Moving average over `window` points (centered, shorter at the ends).
+    `cumsum` are the prefix sums of `values`, if already computed.
+    """
+    if cumsum is None:
+        cumsum = _prefix_sums(values)
+    values = cumsum[1:]
+    half = min(window // 2, (len(values) - 1) // 2)
+    width = 2 * half + 1
+    smoothed = numpy.empty(len(values))
+    middle = smoothed[half : len(values) - half]
+    numpy.subtract(cumsum[width:], cumsum[:-width], out=middle)
+    middle /= width
+    if half:  # shorter windows at the ends
+        count = numpy.arange(half + 1, 2 * half + 1)
+        smoothed[:half] = cumsum[count] / count
+        smoothed[-half:] = ((cumsum[-1] - cumsum[-1 - count]) / count)[::-1]
+    return smoothed
+
+
+def reflectance(height: float, fxd_params: FxdParams) -> float:
+    """
+    Reflectance in dB of a reflection `height` dB above the fiber.
+    """
+    pulse_db = 10 * math.log10(fxd_params.pulse_width.value)
+    return fxd_params.BC.value + pulse_db + 10 * math.log10(10 ** (height / 5) - 1)
+
+
+def reflection_height(reflectance_db: float, fxd_params: FxdParams) -> float:
+    """
+    Height above the fiber in dB of a reflection of `reflectance_db`.
+    """
+    pulse_db = 10 * math.log10(fxd_params.pulse_width.value)
+    ratio = 10 ** ((reflectance_db - fxd_params.BC.value - pulse_db) / 10)
+    return 5 * math.log10(1 + ratio)
+
+
+def _runs(mask) -> List[Tuple[int, int]]:
+    """
+    [start, end) of the runs of True of `mask`.
+    """
+    edges = numpy.flatnonzero(mask[1:] != mask[:-1]) + 1
+    if len(mask) and mask[0]:
+        edges = numpy.concatenate(([0], edges))
+    if len(mask) and mask[-1]:
+        edges = numpy.concatenate((edges, [len(mask)]))
+    return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+
+class _LineFit:
+    """
+    Least-squares lines on [start, end) ranges of a trace, from the prefix
+    sums of y and x * y.
+    """
+
+    def __init__(self, y, cumsum):
+        self.sum_y = cumsum
+        xy = numpy.arange(len(y), dtype=numpy.float64)
+        xy *= y
+        self.sum_xy = _prefix_sums(xy)
+
+    def fit(self, start, end) -> Tuple:
+        """
+        (slope per point, value at `start`) of the lines of ranges, arrays.
+        """
+        start = numpy.asarray(start, dtype=numpy.int64)
+        end = numpy.maximum(numpy.asarray(end, dtype=numpy.int64), start + 1)
+        n = (end - start).astype(numpy.float64)
+        sum_y = self.sum_y[end] - self.sum_y[start]
+        # x counted from start, for precision
+        sum_xy = self.sum_xy[end] - self.sum_xy[start] - start * sum_y
+        sum_x = n * (n - 1) / 2
+        sum_xx = (n - 1) * n * (2 * n - 1) / 6
+        denominator = n * sum_xx - sum_x**2
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            slope = numpy.where(
+                denominator > 0, (n * sum_xy - sum_x * sum_y) / denominator, 0.0
+            )
+        return slope, (sum_y - slope * sum_x) / n
+
+
+def _outside(values, threshold: float):
+    # without the temporary array of abs(values)
+    return (values > threshold) | (values < -threshold)
+
+
+def _sample(values):
+    """
+    At most about STATISTICS_SAMPLES evenly spaced `values`, for medians.
+    """
+    return values[:: max(1, len(values) // STATISTICS_SAMPLES)]
+
+
+def _median(values) -> float:
+    """
+    Median of the sample of `values`, the upper one for an even size.
+    """
+    values = _sample(values)
+    if not len(values):
+        return 0.0
+    middle = len(values) // 2
+    return float(numpy.partition(values, middle)[middle])
+
+
+def _mad(values) -> float:
+    """
+    Standard deviation of normal noise from the median absolute deviation,
+    events barely change it.
+    """
+    values = _sample(values)
+    return 1.4826 * _median(numpy.abs(values - _median(values)))
+
+
+def _end_of_fiber(ys, g: int, threshold: float, start: int) -> Optional[int]:
+    """
+    First point from which the trace stays `threshold` below the fiber `g`
+    points before. The max of the trace after each point is bounded by the
+    max of the following blocks, it's computed exactly in candidate blocks.
+    """
+    tail = ys[start + g :]
+    fiber = ys[start : len(ys) - g]
+    if not len(tail):
+        return None
+    blocks = numpy.arange(0, len(tail), EOF_BLOCK)
+    # max of the trace after each block
+    after = numpy.maximum.accumulate(numpy.maximum.reduceat(tail, blocks)[::-1])
+    after = numpy.append(after[::-1][1:], -numpy.inf)
+    candidates = numpy.maximum.reduceat(fiber, blocks) - after > threshold
+    for lo in blocks[candidates].tolist():
+        block = tail[lo : lo + EOF_BLOCK]
+        tail_max = numpy.maximum.accumulate(block[::-1])[::-1]
+        found = (
+            fiber[lo : lo + EOF_BLOCK] - numpy.maximum(tail_max, after[lo // EOF_BLOCK])
+            > threshold
+        )
+        if found.any():
+            return start + g + lo + int(numpy.argmax(found))
+    return None
+
+
+def _reflections(y, ys, g: int, start: int, end: int, noise: float) -> List[_Event]:
+    """
+    Points above the fiber on both sides, the height is measured on the raw
+    points: smoothing flattens the peaks.
+    """
+    end = min(end, len(ys) - g)
+    height = numpy.maximum(ys[start - g : end - g], ys[start + g : end + g])
+    numpy.subtract(ys[start:end], height, out=height)
+    threshold = NOISE_FACTOR * max(_mad(height), noise)
+    events = []
+    for lo, hi in _runs(height > threshold):
+        lo, hi = start + lo, start + hi
+        peak = lo + int(numpy.argmax(y[lo:hi]))
+        events.append(_Event(lo, peak, hi + g, float(y[peak] - ys[lo - g])))
+    return events
+
+
+def _losses(
+    step, g: int, threshold: float, start: int, end: int, masked: List[_Event]
+) -> List[_Event]:
+    start += g
+    candidates = _outside(step[start : max(end - 2 * g, start)], threshold)
+    for event in masked:  # both sides of a reflection look like steps
+        candidates[max(event.index - 2 * g - start, 0) : event.end + 2 * g - start] = (
+            False
+        )
+    events = []
+    for lo, hi in _runs(candidates):
+        lo, hi = start + lo, start + hi
+        # the backscatter falls over a pulse width from the event
+        center = lo + int(numpy.argmax(numpy.abs(step[lo:hi])))
+        events.append(_Event(center - g // 2, center, center + g, 0.0))
+    return events
+
+
+class _Sections(NamedTuple):
+    """
+    Least-squares lines of the fiber between events, and the level of the
+    fiber before and after each event (nan if no fiber).
+    """
+
+    start: "numpy.ndarray"
+    end: "numpy.ndarray"
+    slope: "numpy.ndarray"  # per point
+    level: "numpy.ndarray"  # at start
+    before: "numpy.ndarray"
+    after: "numpy.ndarray"
+
+
+def _sections(
+    fit: _LineFit, events: List[_Event], trace_end: Optional[int]
+) -> _Sections:
+    """
+    Section k is [end of event k, start of event k+1), the last one goes to
+    `trace_end` if the last event is not the end of the fiber.
+    """
+    end = [e.index for e in events[1:]]
+    if trace_end is not None:
+        end.append(trace_end)
+    end = numpy.array(end, dtype=numpy.int64)
+    start = numpy.array([e.end for e in events[: len(end)]], dtype=numpy.int64)
+    end = numpy.maximum(end, start + 1)
+    slope, level = fit.fit(start, end)
+    index = numpy.array([e.index for e in events], dtype=numpy.float64)
+    m = len(events) - 1
+    after = numpy.full(len(events), numpy.nan)
+    after[: len(end)] = level + slope * (index[: len(end)] - start)
+    before = numpy.full(len(events), numpy.nan)
+    before[1:] = level[:m] + slope[:m] * (index[1:] - start[:m])
+    return _Sections(start, end, slope, level, before, after)
+
+
+def origin(fxd_params: FxdParams, gen_params: Optional[GenParams] = None) -> float:
+    """
+    Distance in km, from the first point of the trace, of the origin of the
+    distances of the key events: the user offset (GenParams) minus the
+    acquisition offset, in the 0.1 ns units of the file.
+    """
+    user_offset = (gen_params.user_offset or 0) if gen_params is not None else 0
+    offset = user_offset - fxd_params.acquisition_offset
+    return offset * distance_factor(fxd_params.index)
+
+
+def detect_events(
+    data_points: DataPoints,
+    fxd_params: FxdParams,
+    gen_params: Optional[GenParams] = None,
+    window: Optional[int] = None,
+) -> KeyEvents:
+    """
+    Key events of the (first) trace, like the KeyEvents block of the file:
+    the launch event, the events along the fiber, the end of fiber if found.
+    Distances are from the launch, at the user offset of `gen_params`, like
+    the distances of the file. `window` is the smoothing and event size in
+    points, a pulse width by default. ORL is not measured, 0 in the summary.
+
+    Reflections weaker than `refl_threshold` are non-reflective events (with
+    their reflectance), kept if their loss is over the loss threshold.
+    """
+    if numpy is None:
+        raise ImportError("numpy is needed to detect events")
+    if data_points.sample_indices is not None:
+        raise ValueError("Events can't be detected on a decimated trace")
+    y = numpy.asarray(trace_db(data_points))
+    g = window or window_size(fxd_params)
+    if len(y) < 4 * g:
+        raise ValueError(f"Trace of {len(y)} points is too short for a {g} window")
+    step_km = fxd_params.resolution / 1000
+    cumsum = _prefix_sums(y)
+    ys = smooth(y, g, cumsum)
+
+    # front panel reflection at the origin, then the end of the fiber
+    origin_km = origin(fxd_params, gen_params)
+    first = min(max(round(origin_km / step_km), 0), len(ys) - 4 * g)
+    launch = first + int(numpy.argmax(ys[first : first + LAUNCH_WINDOWS * g]))
+    end = _end_of_fiber(ys, g, fxd_params.EOT_threshold.value, launch + g)
+    # without end of fiber, the trace stops where it is clipped at the lowest
+    # power (0 dB), if it is
+    quantum = 0.001 * data_points.scaling_factor
+    floor = ys[launch:] < quantum / 2
+    stop = launch + int(numpy.argmax(floor)) if floor.any() else len(ys)
+    fiber_end = max(stop - g, launch + 2 * g) if end is None else end
+
+    # loss between the fiber g points before and after, attenuation removed
+    step = numpy.zeros(len(ys))
+    numpy.subtract(ys[: -2 * g], ys[2 * g :], out=step[g:-g])
+    fiber = step[launch + g : fiber_end]
+    fiber -= _median(fiber)
+    # no less noise than a step of the points, flat traces have none
+    loss_threshold = max(
+        fxd_params.loss_threshold.value, NOISE_FACTOR * max(_mad(fiber), quantum)
+    )
+    # the fiber starts after the dead zone of the launch
+    settled = ~_outside(fiber, loss_threshold)
+    start = launch + g + (int(numpy.argmax(settled)) if settled.any() else 0)
+
+    refl_threshold = fxd_params.refl_threshold.value
+    reflective_height = (
+        reflection_height(refl_threshold, fxd_params) if refl_threshold else 0.0
+    )
+
+    def reflective(event: _Event) -> bool:
+        return event.height > 0 and event.height >= reflective_height
+
+    reflections = _reflections(y, ys, g, start, fiber_end, quantum)
+    end_reflection = None
+    if end is not None and reflections and reflections[-1].end + g >= end:
+        end_reflection = reflections.pop()  # reflection of the fiber end
+        end = fiber_end = end_reflection.index
+    losses = _losses(step, g, loss_threshold, start, fiber_end, reflections)
+    found = sorted(reflections + losses, key=lambda e: e.index)
+
+    launch_height = float(y[launch] - ys[start])
+    events = [_Event(first, launch, start, launch_height)] + found
+    if end_reflection is not None:
+        events.append(end_reflection._replace(end=len(y)))
+    elif end is not None:
+        events.append(_Event(end, end, len(y), 0.0))
+    trace_end = None if end is not None else max(stop, fiber_end + g)
+
+    # drop the events without loss that are not reflective enough
+    fit = _LineFit(y, cumsum)
+    sections = _sections(fit, events, trace_end)
+    last = len(events) - (1 if end is not None else 0)
+    splice_loss = numpy.nan_to_num(sections.before - sections.after)
+    keep = [
+        k
+        for k, event in enumerate(events)
+        if k == 0
+        or k >= last
+        or reflective(event)
+        or abs(splice_loss[k]) >= loss_threshold
+    ]
+    if len(keep) < len(events):
+        events = [events[k] for k in keep]
+        sections = _sections(fit, events, trace_end)
+        splice_loss = numpy.nan_to_num(sections.before - sections.after)
+
+    m = len(events) - 1
+    index = numpy.array([e.index for e in events], dtype=numpy.float64)
+    index[0] = max(origin_km / step_km, 0)  # launch at the origin, not rounded
+    slope = numpy.zeros(len(events))  # attenuation before the event, dB/km
+    slope[1:] = -sections.slope[:m] / step_km
+
+    def km(points):
+        return numpy.asarray(points, dtype=numpy.float64) * step_km - origin_km
+
+    columns = {
+        "distance": km(index),
+        "peak": km([e.peak for e in events]),
+        "slope": slope,
+        "splice_loss": splice_loss,
+        "refl_loss": [
+            reflectance(e.height, fxd_params) if e.height > 0 else 0.0 for e in events
+        ],
+        "end_of_previous": km(numpy.concatenate((index[:1], sections.start))[: m + 1]),
+        "start_of_current": km(index),
+        "end_of_current": km([e.end for e in events]),
+        "start_of_next": km(numpy.concatenate((sections.end, [stop]))[: m + 1]),
+    }
+    types = []
+    for k, event in enumerate(events):
+        if end is not None and k == m:
+            types.append(END_REFLECTIVE if reflective(event) else END_NON_REFLECTIVE)
+        else:
+            types.append(REFLECTIVE if reflective(event) else NON_REFLECTIVE)
+    table = EventTable(columns, types, [""] * len(events))
+
+    # like instruments: splice losses of the events and losses of the fiber
+    # sections from the launch to the end (the end of fiber loss is 0)
+    final = int(sections.end[-1]) - 1 if end is None else end
+    section_length = numpy.append(index[1:], final)[: len(sections.slope)]
+    section_length -= index[: len(sections.slope)]
+    total_loss = splice_loss.sum() - (sections.slope * section_length).sum()
+    loss_start, loss_end = float(km(index[0])), float(km(final))
+    summary = KeyEventSummary(
+        ORL=0.0,
+        ORL_start=loss_start,
+        ORL_finish=loss_end,
+        loss_start=loss_start,
+        loss_end=loss_end,
+        total_loss=float(total_loss),
+    )
+    logger.debug(
+        f"{len(events)} events, loss threshold {loss_threshold:.3f} dB,"
+        f" reflection threshold {reflective_height:.3f} dB"
+    )
+    return KeyEvents(summary, table)
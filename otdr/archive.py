@@ -0,0 +1,118 @@
+"""
+Read sor files out of zip and tar (gz, bz2, xz) archives, in memory: nothing
+is extracted on disk. A member is named `archive!member`, like
+`campaign.zip!site-1/fiber-3.sor`.
+"""
+
+import tarfile
+import zipfile
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Tuple
+
+SOR_SUFFIX = ".sor"
+ARCHIVE_SUFFIXES = (
+    ".zip",
+    ".tar",
+    ".tar.gz",
+    ".tgz",
+    ".tar.bz2",
+    ".tbz2",
+    ".tar.xz",
+    ".txz",
+)
+MEMBER_SEPARATOR = "!"
+
+
+@dataclass
+class ArchiveMember:
+    """
+    A sor file read from an archive.
+    """
+
+    source: str  # archive!member
+    data: bytes
+    error: Optional[str] = None  # set when it can't be read, data is empty
+
+    def __str__(self) -> str:
+        return self.source
+
+
+def is_archive(path: Path) -> bool:
+    return path.name.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _is_sor(name: str) -> bool:
+    return name.lower().endswith(SOR_SUFFIX)
+
+
+def _error(e: Exception) -> str:
+    return f"{type(e).__name__}: {e}"
+
+
+def _read(source: str, read: Callable[[], bytes]) -> ArchiveMember:
+    try:
+        return ArchiveMember(source, read())
+    except Exception as e:
+        return ArchiveMember(source, b"", _error(e))
+
+
+def iter_archive(path: Path) -> Iterator[ArchiveMember]:
+    """
+    The sor files of an archive, in the order of the archive. Tar archives
+    are read as a stream, compressed ones are never seeked.
+
+    A member that can't be read gives an `ArchiveMember` with an `error`, like
+    the archive itself (named `path`) when it is corrupt or truncated: the
+    members before are still read.
+    """
+    try:
+        if zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir() and _is_sor(info.filename):
+                        yield _read(
+                            f"{path}{MEMBER_SEPARATOR}{info.filename}",
+                            partial(archive.read, info),
+                        )
+            return
+        with tarfile.open(path, "r|*") as archive:
+            for member in archive:
+                if member.isfile() and _is_sor(member.name):
+                    yield _read(
+                        f"{path}{MEMBER_SEPARATOR}{member.name}",
+                        lambda: archive.extractfile(member).read(),
+                    )
+    except Exception as e:
+        yield ArchiveMember(str(path), b"", _error(e))
+
+
+def _split_source(source: str) -> Tuple[str, str]:
+    """
+    Archive and member names of `archive!member`: either can contain the
+    separator, the archive is the shortest prefix that is a file.
+    """
+    position = source.find(MEMBER_SEPARATOR)
+    while position != -1:
+        if Path(source[:position]).is_file():
+            return source[:position], source[position + 1 :]
+        position = source.find(MEMBER_SEPARATOR, position + 1)
+    archive_name, _, name = source.partition(MEMBER_SEPARATOR)
+    return archive_name, name
+
+
+def read_member(source: str) -> ArchiveMember:
+    """
+    Read `archive!member`.
+    """
+    archive_name, name = _split_source(source)
+    path = Path(archive_name)
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            return ArchiveMember(source, archive.read(name))
+    with tarfile.open(path, "r:*") as archive:
+        member = archive.extractfile(name)
+        if member is None:
+            raise ValueError(f"{name} is not a file in {archive_name}")
+        return ArchiveMember(source, member.read())
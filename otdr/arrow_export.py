@@ -0,0 +1,293 @@
+"""
+Export parsed sor files in columnar files (Apache Arrow IPC or Parquet), in
+three tables keyed by file id (the source of the file):
+
+- metadata: one row per file, GenParams, SupParams and FxdParams fields.
+- events: one row per key event.
+- traces: one row per trace, the raw DataPts points as list<uint16>.
+"""
+
+import logging
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from otdr.batch import BatchResult
+from otdr.block_data_structure import EventTable
+
+try:
+    import pyarrow
+    import pyarrow.compute
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # pyarrow is optional, only needed by this module
+    pyarrow = None
+
+logger = logging.getLogger("pyOTDR")
+
+EXPORT_FORMATS = ("arrow", "parquet")
+FILE_SUFFIX = {"arrow": ".arrow", "parquet": ".parquet"}
+
+
+def _field(block_name: str, attribute: str, convert: Callable = None) -> Callable:
+    """
+    Getter of `block.attribute` in the blocks of a file, None if the block is
+    missing or not parsed.
+    """
+
+    def get(blocks: Dict[str, object]):
+        value = getattr(blocks.get(block_name), attribute, None)
+        if value is not None and convert is not None:
+            value = convert(value)
+        return value
+
+    return get
+
+
+def _value(unit_value):
+    return unit_value.value
+
+
+# (column, arrow type, getter)
+METADATA_COLUMNS: List[Tuple[str, str, Callable]] = [
+    ("language", "string", _field("GenParams", "language")),
+    ("cable_id", "string", _field("GenParams", "cable_id")),
+    ("fiber_id", "string", _field("GenParams", "fiber_id")),
+    ("cable_code", "string", _field("GenParams", "cable_code")),
+    ("fiber_type", "string", _field("GenParams", "fiber_type", str)),
+    ("wavelength", "int32", _field("GenParams", "wavelength", _value)),
+    ("build_condition", "string", _field("GenParams", "build_condition")),
+    ("locationA", "string", _field("GenParams", "locationA")),
+    ("locationB", "string", _field("GenParams", "locationB")),
+    ("operator", "string", _field("GenParams", "operator")),
+    ("comment", "string", _field("GenParams", "comment")),
+    ("user_offset", "int64", _field("GenParams", "user_offset")),
+    ("user_offset_distance", "int64", _field("GenParams", "user_offset_distance")),
+    ("supplier", "string", _field("SupParams", "supplier")),
+    ("OTDR", "string", _field("SupParams", "OTDR")),
+    ("OTDR_serial_number", "string", _field("SupParams", "OTDR_serial_number")),
+    ("module", "string", _field("SupParams", "module")),
+    ("module_serial_number", "string", _field("SupParams", "module_serial_number")),
+    ("software", "string", _field("SupParams", "software")),
+    ("other", "string", _field("SupParams", "other")),
+    ("date_time", "timestamp_s", _field("FxdParams", "date_time")),
+    ("index", "float64", _field("FxdParams", "index")),
+    ("pulse_width", "int64", _field("FxdParams", "pulse_width", _value)),
+    ("range", "float64", _field("FxdParams", "range")),
+    ("resolution", "float64", _field("FxdParams", "resolution")),
+    ("sample_spacing", "float64", _field("FxdParams", "sample_spacing", _value)),
+    ("unit", "string", _field("FxdParams", "unit", str)),
+    ("num_average", "int64", _field("FxdParams", "num_average")),
+    ("data_points", "int64", _field("DataPoints", "data_points")),
+    ("num_traces", "int64", _field("DataPoints", "num_traces")),
+    ("scaling_factor", "float64", _field("DataPoints", "scaling_factor")),
+    ("total_loss", "float64", _field("KeyEventSummary", "total_loss")),
+    ("ORL", "float64", _field("KeyEventSummary", "ORL")),
+]
+
+# columns of the events computed from their type (EventDataType)
+EVENT_TYPE_COLUMNS: Dict[str, Callable] = {
+    "reference": lambda t: t.reference,
+    "type": lambda t: str(t.type),
+    "mode": lambda t: str(t.mode),
+}
+
+
+def _event_type(get: Callable) -> Callable:
+    """
+    Getter of an event from the getter of its type, None without type.
+    """
+    return lambda e: None if e.type is None else get(e.type)
+
+
+EVENT_COLUMNS: List[Tuple[str, str, Callable]] = [
+    ("distance", "float64", lambda e: e.distance),
+    ("slope", "float64", lambda e: e.slope),
+    ("splice_loss", "float64", lambda e: e.splice_loss),
+    ("refl_loss", "float64", lambda e: e.refl_loss),
+    ("peak", "float64", lambda e: e.peak),
+    ("end_of_previous", "float64", lambda e: e.end_of_previous),
+    ("start_of_current", "float64", lambda e: e.start_of_current),
+    ("end_of_current", "float64", lambda e: e.end_of_current),
+    ("start_of_next", "float64", lambda e: e.start_of_next),
+    *((name, "string", _event_type(get)) for name, get in EVENT_TYPE_COLUMNS.items()),
+    ("comment", "string", lambda e: e.comment),
+]
+
+
+def _arrow_type(name: str):
+    if name == "timestamp_s":
+        return pyarrow.timestamp("s")
+    return getattr(pyarrow, name)()
+
+
+class ArrowExporter:
+    """
+    Write batch results in `directory`/{metadata,events,traces}.{arrow,parquet}.
+    Rows are buffered and written every `batch_size` files, so the memory used
+    doesn't grow with the number of files.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        export_format: str = "parquet",
+        include_data_points: bool = True,
+        batch_size: int = 1024,
+    ):
+        if pyarrow is None:
+            raise ImportError("pyarrow is needed to export in Arrow or Parquet")
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"export_format should be one of {EXPORT_FORMATS}")
+        directory.mkdir(parents=True, exist_ok=True)
+        self.export_format = export_format
+        self.include_data_points = include_data_points
+        self.batch_size = batch_size
+        self.schemas = {
+            "metadata": self._schema(METADATA_COLUMNS),
+            "events": pyarrow.schema(
+                [("file_id", pyarrow.string()), ("event", pyarrow.uint16())]
+                + [(name, _arrow_type(t)) for name, t, _ in EVENT_COLUMNS]
+            ),
+        }
+        if include_data_points:
+            self.schemas["traces"] = pyarrow.schema(
+                [
+                    ("file_id", pyarrow.string()),
+                    ("trace", pyarrow.uint16()),
+                    ("scaling_factor", pyarrow.float64()),
+                    ("points", pyarrow.list_(pyarrow.uint16())),
+                ]
+            )
+        self.writers = {
+            name: self._open_writer(
+                directory / f"{name}{FILE_SUFFIX[export_format]}", s
+            )
+            for name, s in self.schemas.items()
+        }
+        self._reset()
+
+    def _schema(self, columns):
+        return pyarrow.schema(
+            [("file_id", pyarrow.string()), ("error", pyarrow.string())]
+            + [(name, _arrow_type(t)) for name, t, _ in columns]
+        )
+
+    def _open_writer(self, path: Path, schema):
+        if self.export_format == "parquet":
+            return pyarrow.parquet.ParquetWriter(str(path), schema)
+        return pyarrow.ipc.new_file(str(path), schema)
+
+    def _reset(self):
+        self.rows = 0
+        self.columns = {
+            name: {field.name: [] for field in schema}
+            for name, schema in self.schemas.items()
+            if name != "events"
+        }
+        self.event_batches = []
+        self.trace_offsets = [0]
+        self.trace_values = []
+
+    def add(self, result: BatchResult):
+        blocks = {type(b).__name__: b for b in result.blocks or [] if b is not None}
+        key_events = blocks.get("KeyEvents")
+        if key_events is not None:
+            blocks["KeyEventSummary"] = key_events.summary
+        metadata = self.columns["metadata"]
+        metadata["file_id"].append(result.source)
+        metadata["error"].append(result.error)
+        for name, _, get in METADATA_COLUMNS:
+            metadata[name].append(get(blocks))
+
+        if key_events is not None:
+            if isinstance(key_events.events, EventTable):
+                columns = self._event_table_columns(key_events.events)
+            else:
+                columns = self._event_rows_columns(key_events.events)
+            columns["file_id"] = [result.source] * len(key_events.events)
+            columns["event"] = list(range(len(key_events.events)))
+            self.event_batches.append(
+                pyarrow.RecordBatch.from_pydict(columns, schema=self.schemas["events"])
+            )
+
+        data_points = blocks.get("DataPoints")
+        if self.include_data_points and data_points is not None:
+            traces = self.columns["traces"]
+            for i, (points, scaling_factor) in enumerate(
+                zip(data_points.traces, data_points.scaling_factors)
+            ):
+                traces["file_id"].append(result.source)
+                traces["trace"].append(i)
+                traces["scaling_factor"].append(scaling_factor)
+                # zero copy from the numpy/array/memoryview buffer
+                self.trace_values.append(
+                    pyarrow.Array.from_buffers(
+                        pyarrow.uint16(), len(points), [None, pyarrow.py_buffer(points)]
+                    )
+                )
+                self.trace_offsets.append(self.trace_offsets[-1] + len(points))
+
+        self.rows += 1
+        if self.rows >= self.batch_size:
+            self.flush()
+
+    def _event_table_columns(self, table: EventTable) -> Dict[str, object]:
+        """
+        Columns of the events from the columns of the table, without building
+        the events: the values are not copied, nan (missing) become null.
+        """
+        columns = {}
+        for name, arrow_type, _ in EVENT_COLUMNS:
+            if name in EVENT_TYPE_COLUMNS:
+                get = EVENT_TYPE_COLUMNS[name]
+                columns[name] = [None if t is None else get(t) for t in table.types]
+            elif name == "comment":
+                columns[name] = table.comments
+            elif table.column(name) is None:
+                columns[name] = pyarrow.nulls(len(table), pyarrow.float64())
+            else:
+                values = pyarrow.Array.from_buffers(
+                    pyarrow.float64(),
+                    len(table),
+                    [None, pyarrow.py_buffer(table.column(name))],
+                )
+                columns[name] = pyarrow.compute.if_else(
+                    pyarrow.compute.is_nan(values), None, values
+                )
+        return columns
+
+    def _event_rows_columns(self, events) -> Dict[str, list]:
+        return {
+            name: [get(event) for event in events] for name, _, get in EVENT_COLUMNS
+        }
+
+    def flush(self):
+        if not self.rows:
+            return
+        self.writers["events"].write_table(
+            pyarrow.Table.from_batches(self.event_batches, self.schemas["events"])
+        )
+        for name, columns in self.columns.items():
+            if name == "traces":
+                values = (
+                    pyarrow.concat_arrays(self.trace_values)
+                    if self.trace_values
+                    else pyarrow.array([], pyarrow.uint16())
+                )
+                columns["points"] = pyarrow.ListArray.from_arrays(
+                    pyarrow.array(self.trace_offsets, pyarrow.int32()), values
+                )
+            table = pyarrow.Table.from_pydict(columns, schema=self.schemas[name])
+            self.writers[name].write_table(table)
+        self._reset()
+
+    def close(self):
+        self.flush()
+        for writer in self.writers.values():
+            writer.close()
+
+    def __enter__(self) -> "ArrowExporter":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,202 @@
+import glob
+import logging
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from functools import partial
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Union
+
+from otdr.archive import SOR_SUFFIX, ArchiveMember, is_archive, iter_archive
+from otdr.block_data_structure import BaseBlockData, detached
+from otdr.block_parsers import ChecksumMode
+from otdr.cache import ParseCache
+from otdr.file_parser import ParserFactory
+
+logger = logging.getLogger("pyOTDR")
+
+# number of chunks submitted to the pool for each worker, bound the memory
+# used by pending results when the consumer is slower than the workers.
+PENDING_CHUNKS_PER_WORKER = 4
+
+
+@dataclass
+class BatchResult:
+    """
+    Result of the parsing of one file. `error` is set instead of `blocks` if
+    the file could not be parsed.
+    """
+
+    source: str
+    blocks: Optional[List[BaseBlockData]] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def iter_sor_files(
+    inputs: Iterable[Union[str, Path]],
+) -> Iterator[Union[Path, ArchiveMember]]:
+    """
+    Expand inputs in sor files: directories are walked recursively for .sor
+    files and archives, glob patterns are expanded, the sor files of zip and
+    tar archives are read in memory (see `iter_archive` for unreadable ones),
+    other paths are returned as is.
+    """
+    for source in inputs:
+        path = Path(source)
+        if path.is_dir():
+            paths = sorted(
+                p
+                for p in path.rglob("*")
+                if p.suffix.lower() == SOR_SUFFIX or is_archive(p)
+            )
+        elif glob.has_magic(str(source)):
+            paths = (Path(p) for p in sorted(glob.iglob(str(source), recursive=True)))
+        else:
+            paths = [path]
+        for path in paths:
+            if is_archive(path) and path.is_file():
+                yield from iter_archive(path)
+            else:
+                yield path
+
+
+def parse_file(
+    sor_file: Union[Path, ArchiveMember],
+    block_names: Optional[Iterable[str]] = None,
+    checksum: ChecksumMode = ChecksumMode.lazy,
+    cache: Optional[ParseCache] = None,
+) -> BatchResult:
+    """
+    Parse a file, or only `block_names`, and capture any error. With a
+    `cache`, the file is only parsed if it's not in the cache.
+    """
+    if isinstance(sor_file, ArchiveMember):
+        if sor_file.error is not None:
+            logger.warning(f"Cannot read {sor_file.source}: {sor_file.error}")
+            return BatchResult(sor_file.source, error=sor_file.error)
+        source, path, data = sor_file.source, None, sor_file.data
+    else:
+        source, path, data = str(sor_file), Path(sor_file), None
+    try:
+        if cache is not None:
+            if data is None and cache.key_by == "content":
+                data = path.read_bytes()
+            key = cache.key(
+                path, data, block_names=block_names, checksum=ChecksumMode(checksum)
+            )
+            blocks = cache.get(key)
+            if blocks is not None:
+                return BatchResult(source, blocks)
+        sor = path if data is None else data
+        with ParserFactory.create_parser(sor, checksum=checksum) as parser:
+            if block_names is None:
+                blocks = parser.parse()
+            else:
+                blocks = [parser[n] for n in block_names if n in parser.blocks]
+        if cache is not None:
+            cache.put(key, blocks)
+        return BatchResult(source, blocks)
+    except Exception as e:
+        logger.warning(f"Cannot parse {source}: {e}")
+        return BatchResult(source, error=f"{type(e).__name__}: {e}")
+
+
+# cache of a worker process, set once by `_init_worker`
+_worker_cache: Optional[ParseCache] = None
+
+
+def _init_worker(cache: Optional[ParseCache]) -> None:
+    global _worker_cache
+    _worker_cache = cache
+
+
+def _parse_chunk(
+    sor_files: List[Union[Path, ArchiveMember]], **options
+) -> List[BatchResult]:
+    """
+    Parse files in a worker: the blocks are detached from the buffers they
+    were parsed from, to be pickled back to the main process.
+    """
+    results = [
+        parse_file(sor_file, cache=_worker_cache, **options) for sor_file in sor_files
+    ]
+    for result in results:
+        if result.ok:
+            result.blocks = [detached(block) for block in result.blocks]
+    return results
+
+
+def _chunks(sor_files: Iterable, chunksize: int) -> Iterator[List]:
+    sor_files = iter(sor_files)
+    while True:
+        chunk = list(islice(sor_files, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_batch(
+    inputs: Iterable[Union[str, Path]],
+    workers: Optional[int] = None,
+    ordered: bool = True,
+    chunksize: int = 16,
+    block_names: Optional[Iterable[str]] = None,
+    checksum: ChecksumMode = ChecksumMode.lazy,
+    cache: Optional[ParseCache] = None,
+) -> Iterator[BatchResult]:
+    """
+    Parse every sor file of `inputs` (see `iter_sor_files`) in a process pool
+    of `workers` processes (default to the number of CPU, 0 parse in the
+    current process). Files are sent to the workers by chunk of `chunksize`.
+
+    Results are yielded as soon as they are available: in the order of the
+    inputs if `ordered`, in order of completion otherwise. A file that cannot be
+    parsed (or with a wrong checksum in strict `checksum` mode) gives a result
+    with an error, it doesn't stop the batch.
+
+    Workers share the `cache` directory, see `otdr.cache.ParseCache`.
+    """
+    if block_names is not None:
+        block_names = tuple(block_names)
+    sor_files = iter_sor_files(inputs)
+    if workers == 0:
+        for sor_file in sor_files:
+            yield parse_file(sor_file, block_names, checksum, cache)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    if cache is not None:
+        # the workers share the room left in the cache directory
+        cache = cache.shared(workers)
+    chunks = _chunks(sor_files, chunksize)
+    parse_chunk = partial(_parse_chunk, block_names=block_names, checksum=checksum)
+    max_pending = workers * PENDING_CHUNKS_PER_WORKER
+    with ProcessPoolExecutor(
+        workers, initializer=_init_worker, initargs=(cache,)
+    ) as executor:
+        if ordered:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(parse_chunk, chunk))
+                if len(pending) >= max_pending:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        else:
+            pending = set()
+            for chunk in chunks:
+                pending.add(executor.submit(parse_chunk, chunk))
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from future.result()
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
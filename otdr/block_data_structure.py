@@ -1,13 +1,16 @@
 """
-All the data structure needed to serialise to 
+All the data structure needed to serialise to
 """
 
 import logging
+import math
+import sys
 from abc import ABC
-from dataclasses import dataclass
+from array import array
+from dataclasses import dataclass, replace
 from datetime import datetime
 from enum import Enum
-from typing import List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
 
 logger = logging.getLogger("pyOTDR")
 
@@ -67,8 +70,19 @@ class SupParams(BaseBlockData):
 @dataclass
 class Cksum(BaseBlockData):
     file_checksum: int
-    computed_checksum: int
-    match: bool
+    computed_checksum: Optional[int]  # None if the checksum is not checked
+    match: Optional[bool]
+
+
+@dataclass
+class ProprietaryBlock(BaseBlockData):
+    """
+    A block that is not decoded: its raw bytes, a view of the file when it is
+    parsed from memory.
+    """
+
+    name: str
+    data: Union[bytes, memoryview]
 
 
 @dataclass
@@ -78,7 +92,14 @@ class DataPoints(BaseBlockData):
     data_points: int
     num_traces: int
     scaling_factor: float
-    points: List[float] = None  # If we don't want points.
+    # numpy uint16 array, or array("H") without numpy. None if we don't want points.
+    points: Optional[Sequence[int]] = None  # first trace
+    # Every trace, views on one buffer: a 2-D numpy array when they have the
+    # same length, a list otherwise. Each trace has its scaling factor.
+    traces: Optional[Sequence[Sequence[int]]] = None
+    scaling_factors: Optional[List[float]] = None
+    # Only when decimated: index in the full trace of each point, per trace.
+    sample_indices: Optional[List[Sequence[int]]] = None
 
 
 @dataclass
@@ -99,6 +120,12 @@ class MsValue:
     unit: str = "ms"
 
 
+@dataclass
+class UsValue:
+    value: float
+    unit: str = "us"
+
+
 @dataclass
 class NmValue:
     value: int
@@ -132,9 +159,20 @@ class FxdParams(BaseBlockData):
     range: float
     refl_threshold: DBValue
     resolution: float
-    sample_spacing: MsValue
+    sample_spacing: UsValue
     unit: LengthUnit
     wavelength: NmValue
+    # range is computed from the resolution, this is the one stored in the file
+    acquisition_range: Optional[float] = None
+    # Only in v2
+    acquisition_offset_distance: Optional[int] = None
+    acquisition_range_distance: Optional[int] = None
+    averaging_time: Optional[float] = None  # seconds
+    trace_type: Optional[str] = None
+    X1: Optional[int] = None
+    Y1: Optional[int] = None
+    X2: Optional[int] = None
+    Y2: Optional[int] = None
 
 
 class FiberType(Enum):
@@ -160,13 +198,13 @@ class GenParams(BaseBlockData):
     cable_id: str = ""
     fiber_id: str = ""
     cable_code: str = ""
-    wavelength: NmValue
+    wavelength: NmValue = None
     comment: Optional[str] = None
-    fiber_type: FiberType
-    build_condition: Optional[str]
-    locationA: str
-    locationB: str
-    operator: str
+    fiber_type: FiberType = FiberType.UNKNOWN
+    build_condition: Optional[str] = None
+    locationA: str = ""
+    locationB: str = ""
+    operator: str = ""
     user_offset: int = None
     user_offset_distance: int = None
 
@@ -219,7 +257,7 @@ class Event(BaseBlockData):
 
     comment: Optional[str]
     distance: float
-    peak: float
+    peak: float = None  # Only in v2
     refl_loss: float = None
     slope: float = None
     splice_loss: float = None
@@ -230,7 +268,151 @@ class Event(BaseBlockData):
     type: EventDataType = None
 
 
+EVENT_VALUE_FIELDS = (
+    "distance",
+    "peak",
+    "refl_loss",
+    "slope",
+    "splice_loss",
+    "end_of_previous",
+    "start_of_current",
+    "end_of_current",
+    "start_of_next",
+)
+
+
+class EventTable(Sequence):
+    """
+    Key events stored by column: one array("d") per value of `EVENT_VALUE_FIELDS`
+    (None when no event has it, like the v2 only values of a v1 file), the
+    types and the comments in lists. Events with the same type share their
+    `EventDataType`, comments are interned.
+
+    It is a sequence of `Event`: the rows are built when accessed, they are
+    copies, changing them doesn't change the table.
+    """
+
+    __slots__ = ("columns", "types", "comments")
+
+    columns: Dict[str, Optional[array]]
+    types: List[EventDataType]
+    comments: List[Optional[str]]
+
+    def __init__(
+        self,
+        columns: Dict[str, Optional[Iterable[float]]],
+        types: List[EventDataType],
+        comments: List[Optional[str]],
+    ):
+        self.columns = {
+            name: None if columns.get(name) is None else array("d", columns[name])
+            for name in EVENT_VALUE_FIELDS
+        }
+        self.types = types
+        self.comments = [
+            sys.intern(comment) if comment is not None else None for comment in comments
+        ]
+
+    @classmethod
+    def from_events(cls, events: Iterable[Event]) -> "EventTable":
+        events = list(events)
+        columns = {}
+        for name in EVENT_VALUE_FIELDS:
+            values = [getattr(event, name) for event in events]
+            if any(value is not None for value in values):
+                # missing values of a column are stored as nan
+                columns[name] = [math.nan if v is None else v for v in values]
+        return cls(
+            columns,
+            [event.type for event in events],
+            [event.comment for event in events],
+        )
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def _values(self, i: int) -> Dict[str, Any]:
+        values = {}
+        for name, column in self.columns.items():
+            value = None if column is None else column[i]
+            values[name] = None if value is None or math.isnan(value) else value
+        return values
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[Event, List[Event]]:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("event index out of range")
+        return self._row(i)
+
+    def __iter__(self) -> Iterator[Event]:
+        return map(self._row, range(len(self)))
+
+    def _row(self, i: int) -> Event:
+        return Event(comment=self.comments[i], type=self.types[i], **self._values(i))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (EventTable, list, tuple)):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return f"EventTable({list(self)!r})"
+
+    def column(self, name: str) -> Optional[array]:
+        """
+        Values of `name` (one of `EVENT_VALUE_FIELDS`) for all the events, nan
+        for the missing ones.
+        """
+        return self.columns[name]
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """
+        The events as dicts, like `dataclasses.asdict(event)` but without
+        building the events.
+        """
+        records = []
+        for i, event_type in enumerate(self.types):
+            record = {"comment": self.comments[i]}
+            record.update(self._values(i))
+            record["type"] = (
+                None
+                if event_type is None
+                else {
+                    "reference": event_type.reference,
+                    "type": event_type.type,
+                    "mode": event_type.mode,
+                }
+            )
+            records.append(record)
+        return records
+
+
 @dataclass
 class KeyEvents(BaseBlockData):
     summary: KeyEventSummary
-    events: List[Event]
+    events: Sequence[Event]  # EventTable when parsed
+
+
+def detached(block: BaseBlockData) -> BaseBlockData:
+    """
+    The block without the memoryviews on the parsed buffer (traces without
+    numpy, proprietary blocks), copied in arrays or bytes: memoryview can't be
+    pickled, to send the block to another process or store it.
+    """
+    if isinstance(block, ProprietaryBlock):
+        return replace(block, data=bytes(block.data))
+    if not isinstance(block, DataPoints):
+        return block
+
+    def copy(points):
+        return array("H", points) if isinstance(points, memoryview) else points
+
+    points = copy(block.points)
+    traces = block.traces
+    if isinstance(traces, list):
+        # the points are the first trace, keep them shared
+        traces = [points if t is block.points else copy(t) for t in traces]
+    return replace(block, points=points, traces=traces)
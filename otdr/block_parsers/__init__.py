@@ -1,8 +1,15 @@
-from .checksum import CksumParserV1, CksumParserV2
+from .checksum import (
+    ChecksumError,
+    ChecksumMode,
+    CksumParserV1,
+    CksumParserV2,
+    crc_ccitt,
+)
 from .data_points import DataPtsParserV1, DataPtsParserV2
 from .fxd_params import FxdParamsParserV1, FxdParamsParserV2
 from .gen_params import GenParamsParserV1, GenParamsParserV2
 from .key_events import KeyEventsParserV1, KeyEventsParserV2
-from .map_block import MapBlockParser
+from .map_block import MapBlockParser, read_map_block
 from .proprietary import LnkParamsParser, ProprietaryBlockParser
+from .registry import ParserRegistry
 from .sup_params import SupParamsParserV1, SupParamsParserV2
@@ -1,9 +1,9 @@
 import logging
 from abc import abstractmethod
-from typing import BinaryIO
+from typing import BinaryIO, Mapping, Optional, Tuple
 
 from otdr.base_parser import BaseParser
-from otdr.block_data_structure import BaseBlockData
+from otdr.block_data_structure import BaseBlockData, Block
 
 logger = logging.getLogger(__name__)
 
@@ -11,10 +11,16 @@ logger = logging.getLogger(__name__)
 class BlockParser(BaseParser):
     """
     Abstract class to create block parser (like MapBlock, GenParams, etc...)
+
+    A parser that needs other blocks to decode its own (KeyEvents needs the
+    index of FxdParams for distances) lists them in `requires`. They are
+    parsed before it and shared through `context`, see `PartParser`.
     """
 
     data_class: BaseBlockData
     start_position: int = 0
+    requires: Tuple[str, ...] = ()
+    context: Optional[Mapping[str, BaseBlockData]] = None
 
     def __init__(self, filehandler: BinaryIO, start_position: int = 0):
         """
@@ -23,6 +29,24 @@ class BlockParser(BaseParser):
         super().__init__(filehandler)
         self.start_position = start_position
 
+    @classmethod
+    def from_block(
+        cls, filehandler: BinaryIO, block: Block, **options
+    ) -> "BlockParser":
+        """
+        Parser of `block` of the map. `options` are the parsing options of
+        the file (checksum, decimation), for the parsers that use them.
+        """
+        return cls(filehandler, block.position)
+
+    def dependency(self, block_name: str) -> Optional[BaseBlockData]:
+        """
+        A block of `requires`, already parsed. None if the file doesn't have it.
+        """
+        if self.context is None or block_name not in self.context:
+            return None
+        return self.context[block_name]
+
     @abstractmethod
     def parse(self):
         logger.debug(f"seeking at position {self.start_position}")
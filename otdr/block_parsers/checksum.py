@@ -1,26 +1,79 @@
+import binascii
 import logging
+from typing import BinaryIO
 
-import crcmod
-
-from otdr.block_data_structure import Cksum
+from otdr.block_data_structure import BaseEnum, Block, Cksum
 from otdr.block_parsers.abstract_parser import BlockParser
+from otdr.buffer_reader import BufferReader
 from otdr.type_parser import UShortParser
 
 logger = logging.getLogger("pyOTDR")
 
+# binascii.crc_hqx is the CRC-CCITT (poly 0x1021, not reflected) used by sor
+# files ("crc-ccitt-false" once started at 0xFFFF), table driven and in C.
+CRC_CCITT_INIT = 0xFFFF
+CRC_CHUNK_SIZE = 64 * 1024
+
+
+class ChecksumMode(BaseEnum):
+    off = "off"  # only read the checksum stored in the file
+    lazy = "lazy"  # computed when the Cksum block is accessed
+    strict = "strict"  # computed when the file is opened, raise if no match
+
+
+class ChecksumError(ValueError):
+    pass
+
+
+def crc_ccitt(fh: BinaryIO, size: int, crc: int = CRC_CCITT_INIT) -> int:
+    """
+    CRC of the `size` first bytes of the file. A `BufferReader` is read without
+    copy, a file by chunks so the whole file is never in memory.
+    """
+    fh.seek(0)
+    if isinstance(fh, BufferReader):
+        return binascii.crc_hqx(fh.view(size), crc)
+    while size > 0:
+        chunk = fh.read(min(size, CRC_CHUNK_SIZE))
+        if not chunk:
+            break
+        crc = binascii.crc_hqx(chunk, crc)
+        size -= len(chunk)
+    return crc
+
+
+class CksumParser(BlockParser):
+    mode: ChecksumMode = ChecksumMode.lazy
+
+    def __init__(
+        self,
+        filehandler: BinaryIO,
+        start_position: int = 0,
+        mode: ChecksumMode = ChecksumMode.lazy,
+    ):
+        super().__init__(filehandler, start_position)
+        self.mode = mode
+
+    @classmethod
+    def from_block(cls, filehandler: BinaryIO, block: Block, **options) -> BlockParser:
+        return cls(filehandler, block.position, options.get("checksum", cls.mode))
+
+    def _checksum(self, file_cs: int, size: int) -> Cksum:
+        if self.mode == ChecksumMode.off:
+            return Cksum(file_cs, None, None)
+        computed_cs = crc_ccitt(self.filehandler, size)
+        return Cksum(file_cs, computed_cs, file_cs == computed_cs)
+
 
-class CksumParserV1(BlockParser):
+class CksumParserV1(CksumParser):
     def parse(self) -> Cksum:
         super().parse()
         fh = self.filehandler
         file_cs = UShortParser(fh).parse()
-        fh.seek(0)
-        computed_cs = crcmod.predefined.Crc("crc-ccitt-false")
-        computed_cs.update(fh.read(self.start_position))
-        return Cksum(file_cs, computed_cs.crcValue, file_cs == computed_cs.crcValue)
+        return self._checksum(file_cs, self.start_position)
 
 
-class CksumParserV2(BlockParser):
+class CksumParserV2(CksumParser):
     def parse(self) -> Cksum:
         super().parse()
         fh = self.filehandler
@@ -28,7 +81,4 @@ class CksumParserV2(BlockParser):
         if block_name != "Cksum\0":
             raise ValueError(f"Block name should be Cksum got {block_name}")
         file_cs = UShortParser(fh).parse()
-        fh.seek(0)
-        computed_cs = crcmod.predefined.Crc("crc-ccitt-false")
-        computed_cs.update(fh.read(self.start_position + len("Cksum\0")))
-        return Cksum(file_cs, computed_cs.crcValue, file_cs == computed_cs.crcValue)
+        return self._checksum(file_cs, self.start_position + len("Cksum\0"))
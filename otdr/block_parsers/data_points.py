@@ -1,38 +1,156 @@
 import logging
+import sys
+from array import array
+from typing import BinaryIO, List, Optional, Sequence, Tuple
 
-from otdr.block_data_structure import DataPoints
+from otdr.block_data_structure import Block, DataPoints
 from otdr.block_parsers.abstract_parser import BlockParser
-from otdr.type_parser import ShortParser, UintParser, UShortParser
+from otdr.buffer_reader import BufferReader
+from otdr.decimation import Decimation, decimate
+from otdr.type_parser import (
+    RecordLayout,
+    ShortParser,
+    UintParser,
+    UShortArrayParser,
+    numpy,
+)
 
 logger = logging.getLogger("pyOTDR")
 
+# Each trace (scale factor) starts with its number of points and scale factor
+TRACE_HEADER_LAYOUT = RecordLayout(("data_points", "I"), ("scaling_factor", "H"))
 
-class DataPtsParserV1(BlockParser):
+
+def _bounds(points) -> Tuple[int, int]:
+    """
+    min and max of the points, without iterating in python on numpy arrays.
+    """
+    if not len(points):
+        return 0, 0
+    if isinstance(points, (array, memoryview)):
+        return min(points), max(points)
+    return int(points.min()), int(points.max())
+
+
+def _read_into(fh: BinaryIO, target: memoryview) -> None:
+    if hasattr(fh, "readinto"):
+        size = fh.readinto(target)
+    else:
+        raw = fh.read(len(target))
+        size = len(raw)
+        target[:size] = raw
+    if size != len(target):
+        raise ValueError(f"Expected {len(target)} bytes of unsigned short, got {size}")
+
+
+def _parse_traces(
+    fh: BinaryIO, number_of_points: int, num_traces: int
+) -> Tuple[Sequence[Sequence[int]], List[float]]:
+    """
+    Points and scaling factor of every trace. On a `BufferReader` traces are
+    views of the file buffer, otherwise they are read in one buffer of
+    `number_of_points` allocated once, and returned as views of it.
+    """
+    scaling_factors = []
+    if isinstance(fh, BufferReader):
+        traces = []
+        for _ in range(num_traces):
+            count, scale = TRACE_HEADER_LAYOUT.unpack(fh)
+            traces.append(UShortArrayParser(fh, count).parse())
+            scaling_factors.append(scale / 1000.0)
+        return traces, scaling_factors
+
+    if numpy is not None:
+        buffer = numpy.empty(number_of_points, dtype="<u2")
+        raw = memoryview(buffer.view(numpy.uint8))
+    else:
+        buffer = array("H", bytes(2 * number_of_points))
+        raw = memoryview(buffer).cast("B")
+    spans = []
+    offset = 0
+    for _ in range(num_traces):
+        count, scale = TRACE_HEADER_LAYOUT.unpack(fh)
+        if offset + count > number_of_points:
+            raise ValueError(
+                f"DataPts traces have more than the {number_of_points} points announced"
+            )
+        _read_into(fh, raw[2 * offset : 2 * (offset + count)])
+        spans.append((offset, count))
+        scaling_factors.append(scale / 1000.0)
+        offset += count
+    if numpy is None:
+        if sys.byteorder == "big":
+            buffer.byteswap()
+        buffer = memoryview(buffer)
+    elif len({count for _, count in spans}) == 1 and offset == number_of_points:
+        # Same length: a 2-D array, each row is a trace.
+        return buffer.reshape(num_traces, offset // num_traces), scaling_factors
+    return [buffer[start : start + count] for start, count in spans], scaling_factors
+
+
+class DataPtsParser(BlockParser):
+    """
+    With a `decimation` the traces are reduced to `decimation.points` right
+    after being read, see `otdr.decimation`.
+    """
+
+    decimation: Optional[Decimation] = None
+
+    def __init__(
+        self,
+        filehandler: BinaryIO,
+        start_position: int = 0,
+        decimation: Optional[Decimation] = None,
+    ):
+        super().__init__(filehandler, start_position)
+        self.decimation = decimation
+
+    @classmethod
+    def from_block(cls, filehandler: BinaryIO, block: Block, **options) -> BlockParser:
+        return cls(filehandler, block.position, options.get("decimation"))
+
+    def _data_points(
+        self,
+        number_of_points: int,
+        num_trace: int,
+        traces: Sequence[Sequence[int]],
+        scaling_factors: List[float],
+    ) -> DataPoints:
+        points = traces[0] if len(traces) else None
+        scaling_factor = scaling_factors[0] if scaling_factors else 1.0
+        fs = 0.001 * scaling_factor
+        min_point, max_point = _bounds(points if points is not None else [])
+        sample_indices = None
+        if self.decimation is not None:
+            decimated = [decimate(trace, self.decimation) for trace in traces]
+            sample_indices = [indices for indices, _ in decimated]
+            traces = [values for _, values in decimated]
+            points = traces[0] if traces else None
+        return DataPoints(
+            max_before_offset=max_point * fs,
+            min_before_offset=min_point * fs,
+            data_points=number_of_points,
+            num_traces=num_trace,
+            scaling_factor=scaling_factor,
+            points=points,
+            traces=traces,
+            scaling_factors=scaling_factors,
+            sample_indices=sample_indices,
+        )
+
+
+class DataPtsParserV1(DataPtsParser):
     def parse(self) -> DataPoints:
         super().parse()
         fh = self.filehandler
         number_of_points = UintParser(fh).parse()
         logger.debug(f"{number_of_points=} in DataPts")
         num_trace = ShortParser(fh).parse()
-        if num_trace > 1:
-            logger.error(
-                "Cannot handle sor file with multiple trace. Just 1 will be processed."
-            )
-        _ = UintParser(fh).parse()  # number of point again
-        scaling_factor = UShortParser(fh).parse() / 1000.0
-        points = [UShortParser(fh).parse() for _ in range(number_of_points)]
-        fs = 0.001 * scaling_factor
-        return DataPoints(
-            min(points) * fs,
-            max(points) * fs,
-            number_of_points,
-            num_trace,
-            scaling_factor,
-            points,
-        )
+        traces, scaling_factors = _parse_traces(fh, number_of_points, num_trace)
+        return self._data_points(number_of_points, num_trace, traces, scaling_factors)
 
 
-class DataPtsParserV2(BlockParser):
+class DataPtsParserV2(DataPtsParser):
     def parse(self) -> DataPoints:
         super().parse()
         fh = self.filehandler
@@ -42,19 +160,5 @@ class DataPtsParserV2(BlockParser):
         number_of_points = UintParser(fh).parse()
         logger.debug(f"{number_of_points=} in DataPts")
         num_trace = ShortParser(fh).parse()
-        if num_trace > 1:
-            logger.error(
-                "Cannot handle sor file with multiple trace. Just 1 will be processed."
-            )
-        _ = UintParser(fh).parse()  # number of point again
-        scaling_factor = UShortParser(fh).parse() / 1000.0
-        points = [UShortParser(fh).parse() for _ in range(number_of_points)]
-        fs = 0.001 * scaling_factor
-        return DataPoints(
-            min(points) * fs,
-            max(points) * fs,
-            number_of_points,
-            num_trace,
-            scaling_factor,
-            points,
-        )
+        traces, scaling_factors = _parse_traces(fh, number_of_points, num_trace)
+        return self._data_points(number_of_points, num_trace, traces, scaling_factors)
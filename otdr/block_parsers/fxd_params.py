@@ -1,12 +1,136 @@
-from otdr.block_data_structure import BaseBlockData
+from datetime import datetime, timezone
+from typing import Dict
+
+from otdr.block_data_structure import (
+    DBValue,
+    FxdParams,
+    LengthUnit,
+    NmValue,
+    NsValue,
+    UsValue,
+)
 from otdr.block_parsers.abstract_parser import BlockParser
+from otdr.type_parser import RecordLayout
+
+SPEED_OF_LIGHT = 299792.458  # km/s
+
+FXD_PARAMS_LAYOUT_V1 = RecordLayout(
+    ("date_time", "I"),  # unix time
+    ("unit", "2s"),
+    ("wavelength", "H"),  # 0.1 nm
+    ("acquisition_offset", "i"),
+    ("number_of_pulse_width_entries", "H"),
+    ("pulse_width", "H"),  # ns
+    ("sample_spacing", "I"),  # 1e-8 us
+    ("data_points", "I"),
+    ("index", "I"),  # 1e-5
+    ("BC", "H"),  # -0.1 dB
+    ("num_average", "I"),
+    ("range", "I"),  # 2e-5 km
+    ("front_panel_offset", "i"),
+    ("noise_floor_level", "H"),
+    ("noise_floor_scaling_factor", "h"),
+    ("power_offset_first_point", "H"),
+    ("loss_threshold", "H"),  # 0.001 dB
+    ("refl_threshold", "H"),  # -0.001 dB
+    ("EOT_threshold", "H"),  # 0.001 dB
+)
+FXD_PARAMS_LAYOUT_V2 = RecordLayout(
+    ("date_time", "I"),
+    ("unit", "2s"),
+    ("wavelength", "H"),
+    ("acquisition_offset", "i"),
+    ("acquisition_offset_distance", "i"),
+    ("number_of_pulse_width_entries", "H"),
+    ("pulse_width", "H"),
+    ("sample_spacing", "I"),
+    ("data_points", "I"),
+    ("index", "I"),
+    ("BC", "H"),
+    ("num_average", "I"),
+    ("averaging_time", "H"),  # 0.1 s
+    ("range", "I"),
+    ("acquisition_range_distance", "i"),
+    ("front_panel_offset", "i"),
+    ("noise_floor_level", "H"),
+    ("noise_floor_scaling_factor", "h"),
+    ("power_offset_first_point", "H"),
+    ("loss_threshold", "H"),
+    ("refl_threshold", "H"),
+    ("EOT_threshold", "H"),
+    ("trace_type", "2s"),
+    ("X1", "i"),
+    ("Y1", "i"),
+    ("X2", "i"),
+    ("Y2", "i"),
+)
+
+
+def resolution(sample_spacing: float, index: float) -> float:
+    """
+    Distance between two points in meters, sample_spacing in us.
+    """
+    return sample_spacing * SPEED_OF_LIGHT / 1000 / index
+
+
+def _fxd_params(raw: Dict[str, int], **extra) -> FxdParams:
+    unit = raw["unit"].decode("ascii")
+    if unit not in LengthUnit.__members__:
+        raise ValueError(f"Unknown distance unit {unit}")
+    sample_spacing = raw["sample_spacing"] * 1e-8
+    index = raw["index"] * 1e-5
+    points_resolution = resolution(sample_spacing, index)
+    return FxdParams(
+        BC=DBValue(raw["BC"] * -0.1),
+        EOT_threshold=DBValue(raw["EOT_threshold"] * 0.001),
+        acquisition_offset=raw["acquisition_offset"],
+        date_time=datetime.fromtimestamp(raw["date_time"], timezone.utc),
+        front_panel_offset=raw["front_panel_offset"],
+        index=index,
+        loss_threshold=DBValue(raw["loss_threshold"] * 0.001),
+        noise_floor_level=raw["noise_floor_level"],
+        noise_floor_scaling_factor=raw["noise_floor_scaling_factor"],
+        num_average=raw["num_average"],
+        data_points=raw["data_points"],
+        number_of_pulse_width_entries=raw["number_of_pulse_width_entries"],
+        power_offset_first_point=raw["power_offset_first_point"],
+        pulse_width=NsValue(raw["pulse_width"]),
+        range=points_resolution * raw["data_points"] / 1000,
+        refl_threshold=DBValue(raw["refl_threshold"] * -0.001),
+        resolution=points_resolution,
+        sample_spacing=UsValue(sample_spacing),
+        unit=LengthUnit[unit],
+        wavelength=NmValue(raw["wavelength"] * 0.1),
+        acquisition_range=raw["range"] * 2e-5,
+        **extra,
+    )
 
 
 class FxdParamsParserV1(BlockParser):
-    def parse(self) -> BaseBlockData:
+    def parse(self) -> FxdParams:
         super().parse()
+        layout = FXD_PARAMS_LAYOUT_V1
+        raw = dict(zip(layout.names, layout.unpack(self.filehandler)))
+        return _fxd_params(raw)
 
 
 class FxdParamsParserV2(BlockParser):
-    def parse(self) -> BaseBlockData:
+    def parse(self) -> FxdParams:
         super().parse()
+        fh = self.filehandler
+        block_name = fh.read(len("FxdParams") + 1).decode("ascii")
+        if block_name != "FxdParams\0":
+            raise ValueError(f"Block should be named FxdParams but found {block_name}")
+        layout = FXD_PARAMS_LAYOUT_V2
+        raw = dict(zip(layout.names, layout.unpack(fh)))
+        return _fxd_params(
+            raw,
+            acquisition_offset_distance=raw["acquisition_offset_distance"],
+            acquisition_range_distance=raw["acquisition_range_distance"],
+            averaging_time=raw["averaging_time"] * 0.1,
+            trace_type=raw["trace_type"].decode("ascii"),
+            X1=raw["X1"],
+            Y1=raw["Y1"],
+            X2=raw["X2"],
+            Y2=raw["Y2"],
+        )
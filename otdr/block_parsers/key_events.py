@@ -1,21 +1,92 @@
 import logging
 import re
+from abc import abstractmethod
+from typing import Dict, List
 
 from otdr.block_data_structure import (
-    Event,
     EventDataType,
     EventModeType,
+    EventTable,
     EventType,
     KeyEvents,
     KeyEventSummary,
 )
 from otdr.block_parsers.abstract_parser import BlockParser
-from otdr.type_parser import IntParser, StringParser, UintParser, UShortParser
+from otdr.block_parsers.fxd_params import SPEED_OF_LIGHT
+from otdr.type_parser import RecordLayout, StringParser, UShortParser
 
 logger = logging.getLogger("pyOTDR")
 
+# Fixed size part of an event, the comment string that follows is parsed apart.
+EVENT_LAYOUT_V1 = RecordLayout(
+    ("number", "H"),
+    ("distance", "I"),
+    ("slope", "h"),
+    ("splice_loss", "h"),
+    ("refl_loss", "i"),
+    ("type", "8s"),
+)
+EVENT_LAYOUT_V2 = RecordLayout(
+    ("number", "H"),
+    ("distance", "I"),
+    ("slope", "h"),
+    ("splice_loss", "h"),
+    ("refl_loss", "i"),
+    ("type", "8s"),
+    ("end_of_previous", "I"),
+    ("start_of_current", "I"),
+    ("end_of_current", "I"),
+    ("start_of_next", "I"),
+    ("peak", "I"),
+)
+SUMMARY_LAYOUT = RecordLayout(
+    ("total_loss", "i"),
+    ("loss_start", "i"),
+    ("loss_end", "I"),
+    ("ORL", "H"),
+    ("ORL_start", "i"),
+    ("ORL_finish", "I"),
+)
+
+
+def distance_factor(index: float) -> float:
+    """
+    km per distance unit of the file (0.1 ns) for the `index` of refraction.
+    """
+    return 1e-4 * SPEED_OF_LIGHT / 1e6 / index
+
 
 class KeyEventParser(BlockParser):
+    requires = ("FxdParams",)
+    # values of the events, see `EventTable`
+    value_fields = ("distance", "slope", "splice_loss", "refl_loss")
+
+    def _parse_table(self, number_of_events: int, factor: float) -> EventTable:
+        columns = {name: [] for name in self.value_fields}
+        types = []
+        comments = []
+        event_types = {}  # events of the same type share it
+        for e in range(number_of_events):
+            raw_type = self._parse_events(factor, columns)
+            if raw_type not in event_types:
+                event_types[raw_type] = self._parse_event_type(raw_type)
+            types.append(event_types[raw_type])
+            comments.append(StringParser(self.filehandler).parse())
+        return EventTable(columns, types, comments)
+
+    @abstractmethod
+    def _parse_events(self, factor: float, columns: Dict[str, List[float]]) -> str:
+        """
+        Append the values of the next event to `columns`, return its raw type.
+        """
+
+    def _distance_factor(self) -> float:
+        fxd_params = self.dependency("FxdParams")
+        if fxd_params is None:
+            logger.warning("No FxdParams block, distances of KeyEvents are not scaled")
+            return 1
+        return distance_factor(fxd_params.index)
+
     def _parse_event_type(self, evt_type: str) -> EventDataType:
         evt_type_pattern = re.compile("(.)(.)9999LS")
         match_res = evt_type_pattern.match(evt_type)
@@ -26,15 +97,22 @@ class KeyEventParser(BlockParser):
         else:
             return EventDataType(evt_type, EventType.unknown, EventModeType.unknown)
 
-    def _parse_summary(self) -> KeyEventSummary:
-        factor = 1  # TODO factor is in FxdParams. How to get it ?
+    def _parse_summary(self, factor: float) -> KeyEventSummary:
+        (
+            total_loss,
+            loss_start,
+            loss_end,
+            orl,
+            orl_start,
+            orl_finish,
+        ) = SUMMARY_LAYOUT.unpack(self.filehandler)
         return KeyEventSummary(
-            total_loss=IntParser(self.filehandler).parse() * 0.001,
-            loss_start=IntParser(self.filehandler).parse() * factor,
-            loss_end=UintParser(self.filehandler).parse() * factor,
-            ORL=UShortParser(self.filehandler).parse() * 0.001,
-            ORL_start=IntParser(self.filehandler).parse() * factor,
-            ORL_finish=UintParser(self.filehandler).parse() * factor,
+            total_loss=total_loss * 0.001,
+            loss_start=loss_start * factor,
+            loss_end=loss_end * factor,
+            ORL=orl * 0.001,
+            ORL_start=orl_start * factor,
+            ORL_finish=orl_finish * factor,
         )
 
 
@@ -44,33 +122,36 @@ class KeyEventsParserV1(KeyEventParser):
         fh = self.filehandler
         number_of_events = UShortParser(fh).parse()
         logger.debug(f"{number_of_events=}")
-        events = list()
-        for e in range(number_of_events):
-            events.append(self._parse_events())
-        summary = self._parse_summary()
+        factor = self._distance_factor()
+        events = self._parse_table(number_of_events, factor)
+        summary = self._parse_summary(factor)
         return KeyEvents(summary, events)
 
-    def _parse_events(self) -> Event:
-        fh = self.filehandler
-        factor = 1  # TODO factor is in FxdParams. How to get it ?
-        _ = UShortParser(fh).parse()  # event number
-        distance = UintParser(fh).parse()
-        slope = UShortParser(fh).parse() * 0.001
-        splice_loss = UShortParser(fh).parse() * 0.001
-        refl_loss = UintParser(fh).parse() * 0.001
-        evt_raw_type = fh.read(8).decode("ascii")
-        evt_type = self._parse_event_type(evt_raw_type)
-        return Event(
-            distance=distance,
-            slope=slope,
-            splice_loss=splice_loss,
-            refl_loss=refl_loss,
-            type=evt_type,
-            comment=StringParser(fh).parse(),
-        )
+    def _parse_events(self, factor: float, columns: Dict[str, List[float]]) -> str:
+        (
+            _,  # event number
+            distance,
+            slope,
+            splice_loss,
+            refl_loss,
+            evt_raw_type,
+        ) = EVENT_LAYOUT_V1.unpack(self.filehandler)
+        columns["distance"].append(distance * factor)
+        columns["slope"].append(slope * 0.001)
+        columns["splice_loss"].append(splice_loss * 0.001)
+        columns["refl_loss"].append(refl_loss * 0.001)
+        return evt_raw_type.decode("ascii")
 
 
 class KeyEventsParserV2(KeyEventParser):
+    value_fields = KeyEventParser.value_fields + (
+        "end_of_previous",
+        "start_of_current",
+        "end_of_current",
+        "start_of_next",
+        "peak",
+    )
+
     def parse(self) -> KeyEvents:
         super().parse()
         fh = self.filehandler
@@ -79,32 +160,32 @@ class KeyEventsParserV2(KeyEventParser):
             raise ValueError(f"Block name should be KeyEvents got {block_name}")
         number_of_events = UShortParser(fh).parse()
         logger.debug(f"{number_of_events=}")
-        events = list()
-        for e in range(number_of_events):
-            events.append(self._parse_events())
-        summary = self._parse_summary()
+        factor = self._distance_factor()
+        events = self._parse_table(number_of_events, factor)
+        summary = self._parse_summary(factor)
         return KeyEvents(summary, events)
 
-    def _parse_events(self) -> Event:
-        fh = self.filehandler
-        factor = 1  # TODO factor is in FxdParams. How to get it ?
-        _ = UShortParser(fh).parse()  # event number
-        distance = UintParser(fh).parse()
-        slope = UShortParser(fh).parse() * 0.001
-        splice_loss = UShortParser(fh).parse() * 0.001
-        refl_loss = UintParser(fh).parse() * 0.001
-        evt_raw_type = fh.read(8).decode("ascii")
-        evt_type = self._parse_event_type(evt_raw_type)
-        return Event(
-            distance=distance,
-            slope=slope,
-            splice_loss=splice_loss,
-            refl_loss=refl_loss,
-            type=evt_type,
-            end_of_previous=UintParser(fh).parse(),
-            start_of_current=UintParser(fh).parse(),
-            end_of_current=UintParser(fh).parse(),
-            start_of_next=UintParser(fh).parse(),
-            peak=UintParser(fh).parse(),
-            comment=StringParser(fh).parse(),
-        )
+    def _parse_events(self, factor: float, columns: Dict[str, List[float]]) -> str:
+        (
+            _,  # event number
+            distance,
+            slope,
+            splice_loss,
+            refl_loss,
+            evt_raw_type,
+            end_of_previous,
+            start_of_current,
+            end_of_current,
+            start_of_next,
+            peak,
+        ) = EVENT_LAYOUT_V2.unpack(self.filehandler)
+        columns["distance"].append(distance * factor)
+        columns["slope"].append(slope * 0.001)
+        columns["splice_loss"].append(splice_loss * 0.001)
+        columns["refl_loss"].append(refl_loss * 0.001)
+        columns["end_of_previous"].append(end_of_previous * factor)
+        columns["start_of_current"].append(start_of_current * factor)
+        columns["end_of_current"].append(end_of_current * factor)
+        columns["start_of_next"].append(start_of_next * factor)
+        columns["peak"].append(peak * factor)
+        return evt_raw_type.decode("ascii")
@@ -1,27 +1,61 @@
 import logging
+from typing import Callable, Tuple
 
 from otdr.block_data_structure import Block, MapBlock
 from otdr.block_parsers.abstract_parser import BlockParser
-from otdr.type_parser import StringParser, UintParser, UShortParser
+from otdr.buffer_reader import BufferReader
+from otdr.type_parser import RecordLayout, StringParser
 
 logger = logging.getLogger("pyOTDR")
 
+MAP_HEADER_LAYOUT = RecordLayout(
+    ("version", "H"),
+    ("size", "I"),
+    ("number_of_block", "H"),
+)
+MAP_NAME = b"Map\0"  # v2 files start with the name of the map block
+# read at the start of a file: enough for the version and the size of the map
+MAP_PREFIX_SIZE = len(MAP_NAME) + MAP_HEADER_LAYOUT.size
+# Fixed size part of a block entry, it follows the name of the block.
+MAP_ENTRY_LAYOUT = RecordLayout(
+    ("version", "H"),
+    ("size", "I"),
+)
+
 
 class MapBlockParser(BlockParser):
     def parse(self) -> MapBlock:
         super().parse()
         fh = self.filehandler
-        version = UShortParser(fh).parse() * 0.01
-        nbytes = UintParser(fh).parse()
+        version, nbytes, number_of_block = MAP_HEADER_LAYOUT.unpack(fh)
+        version *= 0.01
         # get number of block; not including the Map block
-        number_of_block = UShortParser(fh).parse() - 1
+        number_of_block -= 1
         block_position = nbytes
         blocks = list()
         for i in range(number_of_block):
             bname = StringParser(fh).parse()
-            bversion = UShortParser(fh).parse() * 0.01
-            bsize = UintParser(fh).parse()
+            bversion, bsize = MAP_ENTRY_LAYOUT.unpack(fh)
+            bversion *= 0.01
             block = Block(bname, i, block_position, bsize, f"{bversion:.2f}")
             blocks.append(block)
             block_position += bsize
         return MapBlock(blocks, version, nbytes)
+
+
+def read_map_block(read: Callable[[int], bytes]) -> Tuple[int, MapBlock]:
+    """
+    Version of the file and its map block, `read(size)` reading from the start
+    of the file. It is called twice, for a small prefix then the rest of the
+    map: the file doesn't need to be seekable.
+    """
+    prefix = read(MAP_PREFIX_SIZE)
+    version = 2 if prefix.startswith(MAP_NAME) else 1
+    map_offset = len(MAP_NAME) if version == 2 else 0
+    if len(prefix) < map_offset + MAP_HEADER_LAYOUT.size:
+        raise ValueError(f"File of {len(prefix)} bytes is too short for a sor file")
+    _, map_size, _ = MAP_HEADER_LAYOUT.layout.unpack_from(prefix, map_offset)
+    data = prefix + read(max(0, map_size - len(prefix)))
+    if len(data) < map_size:
+        raise ValueError(f"Map block of {map_size} bytes, file ends at {len(data)}")
+    return version, MapBlockParser(BufferReader(data), map_offset).parse()
@@ -1,16 +1,44 @@
 import logging
+from typing import BinaryIO, Union
 
-from otdr.block_data_structure import BaseBlockData
+from otdr.block_data_structure import BaseBlockData, Block, ProprietaryBlock
 from otdr.block_parsers.abstract_parser import BlockParser
+from otdr.buffer_reader import BufferReader
 
 logger = logging.getLogger("pyOTDR")
 
 
-class LnkParamsParser(BlockParser):
-    def parse(self) -> BaseBlockData:
-        super().parse()
+class ProprietaryBlockParser(BlockParser):
+    """
+    Base of the parsers of vendor blocks: `parse` reads the bytes of the block
+    (without copy from a buffer) and `decode` them, by default in a
+    `ProprietaryBlock`.
+    """
 
+    block: Block
+
+    def __init__(self, filehandler: BinaryIO, block: Block):
+        super().__init__(filehandler, block.position)
+        self.block = block
+
+    @classmethod
+    def from_block(cls, filehandler: BinaryIO, block: Block, **options) -> BlockParser:
+        return cls(filehandler, block)
 
-class ProprietaryBlockParser(BlockParser):
     def parse(self) -> BaseBlockData:
         super().parse()
+        fh = self.filehandler
+        if isinstance(fh, BufferReader):
+            data = fh.view(self.block.size)
+        else:
+            data = fh.read(self.block.size)
+        return self.decode(data)
+
+    def decode(self, data: Union[bytes, memoryview]) -> BaseBlockData:
+        return ProprietaryBlock(self.block.name, data)
+
+
+class LnkParamsParser(ProprietaryBlockParser):
+    """
+    Landmarks of the link, not decoded yet: kept as a `ProprietaryBlock`.
+    """
@@ -0,0 +1,133 @@
+"""
+Registry of the block parsers, keyed by block name, version of the file and
+vendor, extended by plugins.
+"""
+
+import logging
+from importlib import metadata
+from typing import Dict, Iterable, Optional, Set, Tuple, Type
+
+from otdr.block_parsers.abstract_parser import BlockParser
+from otdr.block_parsers.checksum import CksumParserV1, CksumParserV2
+from otdr.block_parsers.data_points import DataPtsParserV1, DataPtsParserV2
+from otdr.block_parsers.fxd_params import FxdParamsParserV1, FxdParamsParserV2
+from otdr.block_parsers.gen_params import GenParamsParserV1, GenParamsParserV2
+from otdr.block_parsers.key_events import KeyEventsParserV1, KeyEventsParserV2
+from otdr.block_parsers.proprietary import LnkParamsParser
+from otdr.block_parsers.sup_params import SupParamsParserV1, SupParamsParserV2
+
+logger = logging.getLogger("pyOTDR")
+
+ENTRY_POINT_GROUP = "pyotdr.block_parsers"
+VERSIONS = (1, 2)
+SKIP = None  # registered for the blocks that are not parsed
+
+RegistryKey = Tuple[str, int, Optional[str]]
+
+
+def _entry_points(group: str) -> Iterable[metadata.EntryPoint]:
+    entry_points = metadata.entry_points()
+    if hasattr(entry_points, "select"):
+        return entry_points.select(group=group)
+    return entry_points.get(group, [])  # before Python 3.10
+
+
+class ParserRegistry:
+    """
+    Parser classes keyed by (block name, version, vendor). The vendor, lower
+    case, is matched against the start of the supplier of SupParams; parsers
+    registered without vendor are used for every file. A block registered
+    with `skip` is neither parsed nor read, like the blocks without parser.
+
+    Plugins are functions of the "pyotdr.block_parsers" entry point group,
+    called with the registry before the first lookup:
+
+        [options.entry_points]
+        pyotdr.block_parsers =
+            exfo = pyotdr_exfo:register
+
+        def register(registry):
+            registry.register("ExfoNewProprietaryBlock", ExfoParser, vendor="EXFO")
+    """
+
+    parsers: Dict[RegistryKey, Optional[Type[BlockParser]]] = {}
+    vendors: Set[str] = set()
+    vendor_blocks: Set[Tuple[str, int]] = set()
+    plugins_loaded: bool = False
+
+    @classmethod
+    def register(
+        cls,
+        name: str,
+        parser_class: Optional[Type[BlockParser]],
+        versions: Iterable[int] = VERSIONS,
+        vendor: Optional[str] = None,
+    ) -> None:
+        if vendor is not None:
+            vendor = vendor.lower()
+            cls.vendors.add(vendor)
+        for version in versions:
+            cls.parsers[(name, version, vendor)] = parser_class
+            if vendor is not None:
+                cls.vendor_blocks.add((name, version))
+
+    @classmethod
+    def skip(
+        cls, name: str, versions: Iterable[int] = VERSIONS, vendor: Optional[str] = None
+    ) -> None:
+        cls.register(name, SKIP, versions, vendor)
+
+    @classmethod
+    def load_plugins(cls) -> None:
+        if cls.plugins_loaded:
+            return
+        cls.plugins_loaded = True
+        for entry_point in _entry_points(ENTRY_POINT_GROUP):
+            try:
+                entry_point.load()(cls)
+            except Exception as e:
+                logger.warning(f"Cannot load block parsers of {entry_point.name}: {e}")
+
+    @classmethod
+    def has_vendor_parsers(cls, name: str, version: int) -> bool:
+        """
+        True if the parser of the block depends on the vendor.
+        """
+        cls.load_plugins()
+        return (name, version) in cls.vendor_blocks
+
+    @classmethod
+    def vendor_of(cls, supplier: Optional[str]) -> Optional[str]:
+        """
+        The registered vendor of a supplier ("EXFO Inc." is "exfo").
+        """
+        cls.load_plugins()
+        supplier = (supplier or "").strip().lower()
+        matches = [vendor for vendor in cls.vendors if supplier.startswith(vendor)]
+        return max(matches, key=len, default=None)
+
+    @classmethod
+    def lookup(
+        cls, name: str, version: int, vendor: Optional[str] = None
+    ) -> Optional[Type[BlockParser]]:
+        """
+        Parser class of a block, None if it has none or is skipped.
+        """
+        cls.load_plugins()
+        if vendor is not None and (name, version, vendor) in cls.parsers:
+            return cls.parsers[(name, version, vendor)]
+        return cls.parsers.get((name, version, None))
+
+
+DEFAULT_PARSERS: Dict[str, Tuple[Type[BlockParser], Type[BlockParser]]] = {
+    "Cksum": (CksumParserV1, CksumParserV2),
+    "DataPts": (DataPtsParserV1, DataPtsParserV2),
+    "GenParams": (GenParamsParserV1, GenParamsParserV2),
+    "SupParams": (SupParamsParserV1, SupParamsParserV2),
+    "FxdParams": (FxdParamsParserV1, FxdParamsParserV2),
+    "KeyEvents": (KeyEventsParserV1, KeyEventsParserV2),
+    "LnkParams": (LnkParamsParser, LnkParamsParser),
+}
+for name, (parser_v1, parser_v2) in DEFAULT_PARSERS.items():
+    ParserRegistry.register(name, parser_v1, versions=(1,))
+    ParserRegistry.register(name, parser_v2, versions=(2,))
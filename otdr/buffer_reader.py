@@ -0,0 +1,136 @@
+import io
+import logging
+import mmap
+import struct
+from pathlib import Path
+from typing import Tuple, Union
+
+logger = logging.getLogger("pyOTDR")
+
+BytesLike = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+# size of the chunk used to look for the end of a string in a memoryview.
+STRING_SCAN_CHUNK = 256
+
+
+class BufferReader(io.IOBase):
+    """
+    Read a sor file from memory (bytes, bytearray, memoryview or mmap).
+
+    Behave like a binary file (seek, tell, read) so every parser works with it,
+    but type parsers use `unpack` and `view` to decode at the current offset
+    with `struct.unpack_from` without copying the data.
+
+    Memoryviews returned by `view` keep a reference on the underlying buffer,
+    a mmap can't be closed while one of them is alive.
+    """
+
+    def __init__(self, buffer: BytesLike, base: int = 0):
+        """
+        `base` is the position of the buffer in the file when it only holds a
+        part of it (a block, see `otdr.stream`): seek and tell are positions in
+        the file.
+        """
+        super().__init__()
+        self._buffer = buffer
+        self._view = memoryview(buffer).cast("B")
+        self.base = base
+        self.offset = 0
+        self._owns_buffer = False
+
+    @classmethod
+    def from_mmap(cls, sor_file: Path) -> "BufferReader":
+        """
+        Map the whole file in memory, read only.
+        """
+        with open(sor_file, "rb") as fh:
+            reader = cls(mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ))
+        reader._owns_buffer = True
+        return reader
+
+    def close(self) -> None:
+        """
+        Unmap the file mapped by `from_mmap`. If views of it are still alive
+        (zero-copy traces) it is unmapped when they are released.
+        """
+        if self._owns_buffer and not self.closed:
+            try:
+                self._view.release()
+                self._buffer.close()
+            except BufferError:
+                logger.debug("Memory map still in use, closed when released")
+        super().close()
+
+    def __len__(self) -> int:
+        return len(self._view)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            if offset < self.base:
+                raise ValueError(
+                    f"Position {offset} is before the buffer ({self.base})"
+                )
+            self.offset = offset - self.base
+        elif whence == io.SEEK_CUR:
+            self.offset += offset
+        elif whence == io.SEEK_END:
+            self.offset = len(self._view) + offset
+        else:
+            raise ValueError(f"Invalid whence {whence}")
+        return self.tell()
+
+    def tell(self) -> int:
+        return self.base + self.offset
+
+    def read(self, size: int = -1) -> bytes:
+        return bytes(self.view(size))
+
+    def view(self, size: int = -1) -> memoryview:
+        """
+        Return a zero-copy view of the next `size` bytes and move the offset.
+        """
+        start = self.offset
+        end = len(self._view) if size < 0 else min(start + size, len(self._view))
+        self.offset = max(end, start)
+        return self._view[start:end]
+
+    def unpack(self, layout: struct.Struct) -> Tuple:
+        """
+        Decode `layout` at the current offset and move the offset after it.
+        """
+        result = layout.unpack_from(self._view, self.offset)
+        self.offset += layout.size
+        return result
+
+    def read_until(self, terminator: bytes = b"\x00") -> Tuple[bytes, bool]:
+        """
+        Return the bytes until `terminator` (excluded) and move the offset after
+        it. The boolean is False if the end of the buffer was reached first.
+        """
+        start = self.offset
+        if hasattr(self._buffer, "find"):
+            end = self._buffer.find(terminator, start)
+        else:
+            end = self._find_in_view(terminator, start)
+        if end == -1:
+            self.offset = len(self._view)
+            return bytes(self._view[start:]), False
+        self.offset = end + len(terminator)
+        return bytes(self._view[start:end]), True
+
+    def _find_in_view(self, terminator: bytes, start: int) -> int:
+        # memoryview has no find(), scan it by chunks.
+        position = start
+        while position < len(self._view):
+            chunk = bytes(self._view[position : position + STRING_SCAN_CHUNK])
+            found = chunk.find(terminator)
+            if found != -1:
+                return position + found
+            position += STRING_SCAN_CHUNK
+        return -1
@@ -0,0 +1,199 @@
+"""
+On-disk cache of parsed sor files, for files that are parsed again and again.
+
+Entries are keyed by the content of the file (blake2b hash) or, cheaper, by
+its path, modification time and size, plus the parsing options. An entry is
+the pickled list of blocks behind a small header with `CACHE_VERSION`: bump it
+when the parsers change, older entries are then ignored and replaced.
+
+The cache is bounded by `max_size` bytes, least recently used entries are
+evicted first. Entries are written atomically, several processes can share a
+cache directory: each one stats the directory again once it has written its
+share (1 / `processes`) of the room left at its last stat, so together they
+stay close to `max_size`. Only use a directory you trust, entries are
+unpickled.
+"""
+
+import copy
+import hashlib
+import logging
+import os
+import pickle
+import struct
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+from otdr.block_data_structure import BaseBlockData, detached
+from otdr.block_parsers import ChecksumMode
+from otdr.decimation import Decimation
+from otdr.file_parser import ParserFactory
+
+logger = logging.getLogger("pyOTDR")
+
+CACHE_VERSION = 3
+CACHE_MAGIC = b"pyOTDR-cache"
+CACHE_HEADER = struct.Struct(f"<{len(CACHE_MAGIC)}sH")
+CACHE_SUFFIX = ".pkl"
+DEFAULT_MAX_SIZE = 1024**3
+# eviction goes below the max size, so it doesn't run on each put
+EVICTION_RATIO = 0.9
+KEY_BY = ("content", "stat")
+
+
+class ParseCache:
+    """
+    `key_by` is "content" (the file is read and hashed) or "stat" (path,
+    modification time and size, the file is not read on a hit). `processes`
+    is the number of processes writing in the directory at the same time.
+    """
+
+    directory: Path
+    max_size: int
+    key_by: str
+    processes: int
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        max_size: int = DEFAULT_MAX_SIZE,
+        key_by: str = "content",
+        processes: int = 1,
+    ):
+        if key_by not in KEY_BY:
+            raise ValueError(f"key_by should be one of {KEY_BY}, got {key_by}")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.key_by = key_by
+        self.processes = processes
+        self._size = None  # size of the directory at the last stat, on first put
+        self._written = 0  # bytes written by this process since
+
+    def key(
+        self, sor_file: Optional[Path], data: Optional[bytes] = None, **options
+    ) -> str:
+        """
+        Key of a file parsed with `options`. With the "content" key `data` is
+        the content of the file, read if not given. Without `sor_file` (an
+        archive member) the content is always used.
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f"{CACHE_VERSION}{sorted(options.items())!r}".encode("utf-8"))
+        if self.key_by == "stat" and sor_file is not None:
+            stat = sor_file.stat()
+            path = str(sor_file.resolve())
+            digest.update(f"{path}\0{stat.st_mtime_ns}\0{stat.st_size}".encode("utf-8"))
+        else:
+            digest.update(data if data is not None else sor_file.read_bytes())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}{CACHE_SUFFIX}"
+
+    def get(self, key: str) -> Optional[List[BaseBlockData]]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fh:
+                magic, version = CACHE_HEADER.unpack(fh.read(CACHE_HEADER.size))
+                if magic != CACHE_MAGIC or version != CACHE_VERSION:
+                    raise ValueError(f"Cache entry of version {version}")
+                blocks = pickle.load(fh)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.debug(f"Ignore cache entry {path}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+        os.utime(path)  # most recently used
+        return blocks
+
+    def put(self, key: str, blocks: List[BaseBlockData]) -> None:
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        data = CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION) + pickle.dumps(
+            [detached(b) for b in blocks], protocol=pickle.HIGHEST_PROTOCOL
+        )
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        self._written += len(data)
+        # the other processes write too, check the directory once this one
+        # has written its share of the room left
+        if (
+            self._size is None
+            or self._written > (self.max_size - self._size) / self.processes
+        ):
+            self._size = self.size()
+            self._written = 0
+            if self._size > self.max_size:
+                self.evict()
+
+    def shared(self, processes: int) -> "ParseCache":
+        """
+        Copy of the cache for `processes` processes writing in the directory
+        at the same time, with the size of the directory so that they don't
+        all stat it.
+        """
+        cache = copy.copy(self)
+        cache.processes = processes
+        cache._size = self.size()
+        cache._written = 0
+        return cache
+
+    def _entries(self) -> List[Tuple[Path, os.stat_result]]:
+        entries = []
+        for path in self.directory.glob(f"*/*{CACHE_SUFFIX}"):
+            try:
+                entries.append((path, path.stat()))
+            except FileNotFoundError:  # evicted by another process
+                pass
+        return entries
+
+    def size(self) -> int:
+        return sum(stat.st_size for _, stat in self._entries())
+
+    def evict(self) -> None:
+        """
+        Remove the least recently used entries until the cache is below
+        `max_size`.
+        """
+        entries = sorted(self._entries(), key=lambda e: e[1].st_mtime_ns)
+        size = sum(stat.st_size for _, stat in entries)
+        target = self.max_size * EVICTION_RATIO
+        for path, stat in entries:
+            if size <= target:
+                break
+            path.unlink(missing_ok=True)
+            size -= stat.st_size
+        self._size = size
+        self._written = 0
+
+    def clear(self) -> None:
+        for path, _ in self._entries():
+            path.unlink(missing_ok=True)
+        self._size = 0
+        self._written = 0
+
+    def parse(
+        self,
+        sor_file: Path,
+        checksum: ChecksumMode = ChecksumMode.lazy,
+        decimation: Optional[Decimation] = None,
+    ) -> List[BaseBlockData]:
+        """
+        All the blocks of a file, like `ParserFactory.create_parser().parse()`.
+        """
+        data = sor_file.read_bytes() if self.key_by == "content" else None
+        key = self.key(
+            sor_file, data, checksum=ChecksumMode(checksum), decimation=decimation
+        )
+        blocks = self.get(key)
+        if blocks is None:
+            if data is None:
+                data = sor_file.read_bytes()
+            parser = ParserFactory.create_parser(
+                data, checksum=checksum, decimation=decimation
+            )
+            blocks = parser.parse()
+            self.put(key, blocks)
+        return blocks
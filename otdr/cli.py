@@ -1,58 +1,243 @@
-import json
 import logging
 import os
 import sys
-from dataclasses import asdict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
-from enum import Enum
-from otdr.block_data_structure import BaseEnum
+from typing import BinaryIO, Iterator, Optional, Tuple, Union
 
-import cbor2 as cbor
 import click
-from dicttoxml import dicttoxml
 
+from otdr.archive import MEMBER_SEPARATOR, read_member
+from otdr.arrow_export import ArrowExporter
+from otdr.batch import BatchResult, parse_batch
+from otdr.block_parsers import ChecksumMode
+from otdr.cache import KEY_BY, ParseCache
+from otdr.decimation import Decimation, DecimationMethod
+from otdr.encoder import ENCODERS, blocks_to_plain
 from otdr.file_parser import ParserFactory
+from otdr.generator import random_sor
+from otdr.record_writer import RECORD_WRITERS
+from otdr.stream import StreamParser
+
+
+def setup_logging():
+    logging.basicConfig(format="%(message)s", stream=sys.stderr)
+    logger = logging.getLogger("pyOTDR")
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    logger.setLevel(LOG_LEVEL)
+
+
+def result_to_dict(result: BatchResult, include_data_points: bool) -> dict:
+    if result.ok:
+        return blocks_to_plain(result.blocks, include_data_points)
+    return {"error": result.error}
+
+
+def serialize(final_version: dict, output_format: str) -> Union[str, bytes]:
+    return ENCODERS[output_format](final_version)
+
+
+def dump(final_version: dict, output_format: str, output_file: Optional[str]):
+    serialized = serialize(final_version, output_format)
+    if output_file:
+        # XML and CBOR are bytes
+        if isinstance(serialized, str):
+            serialized = serialized.encode("utf-8")
+        with open(output_file, "wb") as w:
+            w.write(serialized)
+    else:
+        click.echo(serialized)
+
+
+@contextmanager
+def open_output(output_file: Optional[str]) -> Iterator[BinaryIO]:
+    if output_file:
+        with open(output_file, "wb") as w:
+            yield w
+    else:
+        yield click.get_binary_stream("stdout")
 
 
 @click.command()
-@click.argument("sor_file", type=click.Path(exists=True, dir_okay=False, readable=True))
+@click.argument("sor_file", type=click.Path(dir_okay=False, allow_dash=True))
 @click.argument(
     "output_format", default="JSON", type=click.Choice(("JSON", "XML", "CBOR"))
 )
 @click.option("--timezone", default="UTC")
 @click.option("-o", "--output", "output_file", default=None)
 @click.option("--include-data-points", default=False, is_flag=True)
+@click.option("--mmap", "use_mmap", default=False, is_flag=True)
+@click.option(
+    "--checksum",
+    default="lazy",
+    type=click.Choice([m.value for m in ChecksumMode]),
+    help="off: don't compute it, strict: fail if it doesn't match.",
+)
+@click.option(
+    "--decimate",
+    type=click.IntRange(min=3),
+    default=None,
+    help="Reduce each trace to about this number of points.",
+)
+@click.option(
+    "--decimation-method",
+    default="minmax",
+    type=click.Choice([m.value for m in DecimationMethod]),
+)
 def main(
     sor_file: str,
     output_format: str,
     timezone: str,
     output_file: Optional[str],
     include_data_points: bool,
+    use_mmap: bool,
+    checksum: str,
+    decimate: Optional[int],
+    decimation_method: str,
 ) -> None:
-    logging.basicConfig(format="%(message)s", stream=sys.stderr)
-    logger = logging.getLogger("pyOTDR")
-    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
-    logger.setLevel(LOG_LEVEL)
-    parser = ParserFactory.create_parser(Path(sor_file))
-    blocks = parser.parse()
-    final_version = dict()
-    # convert all blocks to dict and enum to strings
-    for block in blocks:
-        if block:
-            if not include_data_points and block.__class__.__name__ == "DataPoints":
-                block.points = None
-            final_version[block.__class__.__name__] = asdict(block)
-    dump = ""
-    if output_format == "JSON":
-        dump = json.dumps(final_version, indent=2, default=str)
-    if output_format == "XML":
-        dump = dicttoxml(final_version)
-    if output_format == "CBOR":
-        dump = cbor.dumps(final_version)
+    setup_logging()
+    decimation = None
+    if decimate is not None:
+        decimation = Decimation(decimate, DecimationMethod(decimation_method))
+    if sor_file == "-":
+        # stdin can't be seeked, parse it as it is read
+        blocks = StreamParser(sys.stdin.buffer, checksum, decimation).parse()
+    elif Path(sor_file).is_file():
+        with ParserFactory.create_parser(
+            Path(sor_file), use_mmap, checksum, decimation
+        ) as parser:
+            blocks = parser.parse()
+    elif MEMBER_SEPARATOR in sor_file:
+        member = read_member(sor_file)
+        parser = ParserFactory.create_parser(member.data, False, checksum, decimation)
+        blocks = parser.parse()
+    else:
+        raise click.BadParameter(
+            f"{sor_file} is not a file nor an archive member (archive.zip!file.sor)",
+            param_hint="SOR_FILE",
+        )
+    dump(blocks_to_plain(blocks, include_data_points), output_format, output_file)
 
-    if output_file:
-        with open(output_file, "w") as w:
-            w.write(dump)
+
+@click.command()
+@click.argument("inputs", nargs=-1)
+@click.option(
+    "-f",
+    "--format",
+    "output_format",
+    default="JSON",
+    type=click.Choice(("JSON", "XML", "CBOR", *RECORD_WRITERS, "ARROW", "PARQUET")),
+    help="NDJSON and CBORSEQ write one record per file as soon as it is parsed. "
+    "ARROW and PARQUET write metadata, events and traces tables in the -o directory.",
+)
+@click.option("-o", "--output", "output_file", default=None)
+@click.option(
+    "--from-file",
+    type=click.File("r"),
+    default=None,
+    help="Read the files to parse from this file, one per line (- for stdin).",
+)
+@click.option("-j", "--workers", type=int, default=None, help="Default to CPU count.")
+@click.option("--chunksize", type=int, default=16)
+@click.option("--unordered", default=False, is_flag=True)
+@click.option("--include-data-points", default=False, is_flag=True)
+@click.option(
+    "--checksum",
+    default="lazy",
+    type=click.Choice([m.value for m in ChecksumMode]),
+    help="off: don't compute it, strict: fail if it doesn't match.",
+)
+@click.option(
+    "--cache",
+    "cache_dir",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="Keep parsed files in this directory, to not parse them again.",
+)
+@click.option("--cache-size", type=int, default=1024, help="In MiB.")
+@click.option(
+    "--cache-key",
+    default="content",
+    type=click.Choice(KEY_BY),
+    help="stat: path, modification time and size, the file is not read on a hit.",
+)
+def batch(
+    inputs: Tuple[str],
+    output_format: str,
+    output_file: Optional[str],
+    from_file,
+    workers: Optional[int],
+    chunksize: int,
+    unordered: bool,
+    include_data_points: bool,
+    checksum: str,
+    cache_dir: Optional[str],
+    cache_size: int,
+    cache_key: str,
+) -> None:
+    """
+    Parse every sor file of INPUTS (files, directories, glob patterns or zip
+    and tar archives) in parallel.
+    """
+    setup_logging()
+    sources = list(inputs)
+    if from_file is not None:
+        sources.extend(line.strip() for line in from_file if line.strip())
+    cache = None
+    if cache_dir is not None:
+        cache = ParseCache(cache_dir, cache_size * 1024 * 1024, cache_key)
+    results = parse_batch(
+        sources,
+        workers,
+        not unordered,
+        chunksize,
+        checksum=ChecksumMode(checksum),
+        cache=cache,
+    )
+    if output_format in ("ARROW", "PARQUET"):
+        if not output_file:
+            raise click.UsageError(f"{output_format} needs an output directory (-o)")
+        with ArrowExporter(
+            Path(output_file), output_format.lower(), include_data_points
+        ) as exporter:
+            for result in results:
+                exporter.add(result)
+    elif output_format in RECORD_WRITERS:
+        with open_output(output_file) as stream:
+            writer = RECORD_WRITERS[output_format](stream)
+            for result in results:
+                record = {"source": result.source}
+                record.update(result_to_dict(result, include_data_points))
+                writer.write(record)
+            writer.flush()
     else:
-        click.echo(dump)
+        final_version = dict()
+        for result in results:
+            final_version[result.source] = result_to_dict(result, include_data_points)
+        dump(final_version, output_format, output_file)
+
+
+@click.command()
+@click.argument("output_dir", type=click.Path(file_okay=False))
+@click.option("-n", "--count", type=int, default=1)
+@click.option("--points", type=int, default=16000)
+@click.option("--events", type=int, default=10)
+@click.option("--version", type=click.Choice(("1", "2")), default="2")
+@click.option("--seed", type=int, default=None)
+def generate(
+    output_dir: str,
+    count: int,
+    points: int,
+    events: int,
+    version: str,
+    seed: Optional[int],
+) -> None:
+    """
+    Write COUNT random sor files in OUTPUT_DIR, to build load-test corpora.
+    """
+    directory = Path(output_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    for i in range(count):
+        file_seed = None if seed is None else seed + i
+        data = random_sor(points, events, int(version), file_seed)
+        (directory / f"synthetic_{i:06d}.sor").write_bytes(data)
@@ -0,0 +1,127 @@
+"""
+Reduce a trace to a few points for display, keeping its shape:
+
+- minmax: the min and the max of each bucket, spikes (reflections) are kept.
+- lttb: Largest-Triangle-Three-Buckets, one point per bucket, the one making
+  the largest triangle with its neighbours.
+
+Vectorized with numpy, plain python otherwise. The indices of the kept points
+in the full trace are returned with their values, to rebuild the distances.
+"""
+
+from array import array
+from dataclasses import dataclass
+from typing import Sequence, Tuple
+
+from otdr.block_data_structure import BaseEnum
+from otdr.type_parser import numpy
+
+
+class DecimationMethod(BaseEnum):
+    minmax = "minmax"
+    lttb = "lttb"
+
+
+@dataclass
+class Decimation:
+    points: int  # at most, 2 per bucket for minmax
+    method: DecimationMethod = DecimationMethod.minmax
+
+
+def _buckets(size: int, count: int) -> Sequence[int]:
+    """
+    Start of `count` buckets splitting `size` points, and `size` at the end.
+    """
+    if numpy is not None:
+        return numpy.linspace(0, size, count + 1).astype(numpy.int64)
+    return [size * i // count for i in range(count + 1)]
+
+
+def minmax_indices(points: Sequence[int], threshold: int) -> Sequence[int]:
+    size = len(points)
+    edges = _buckets(size, max(1, threshold // 2))
+    if numpy is not None:
+        values = numpy.asarray(points, dtype=numpy.int64) * size
+        index = numpy.arange(size, dtype=numpy.int64)
+        starts = edges[:-1]
+        # value * size + index: reduceat gives the value and its (first) index
+        lows = numpy.minimum.reduceat(values + index, starts) % size
+        highs = (
+            size
+            - 1
+            - numpy.maximum.reduceat(values + (size - 1 - index), starts) % size
+        )
+        pairs = numpy.sort(numpy.stack([lows, highs], axis=1), axis=1)
+        return numpy.unique(pairs.ravel())
+    indices = array("L")
+    for start, end in zip(edges, edges[1:]):
+        bucket = range(start, end)
+        low = min(bucket, key=points.__getitem__)
+        high = max(bucket, key=points.__getitem__)
+        for i in sorted({low, high}):
+            indices.append(i)
+    return indices
+
+
+def lttb_indices(points: Sequence[int], threshold: int) -> Sequence[int]:
+    size = len(points)
+    threshold = max(threshold, 3)
+    # first and last points are kept, the others are split in buckets
+    edges = [1 + e for e in _buckets(size - 2, threshold - 2)]
+    if numpy is not None:
+        y = numpy.asarray(points, dtype=numpy.float64)
+        edges = numpy.asarray(edges)
+        # average of each bucket, and of the last point after the last one
+        sums = numpy.add.reduceat(y, edges[:-1])
+        counts = numpy.diff(edges)
+        avg_y = numpy.append(sums / counts, y[-1])
+        avg_x = numpy.append((edges[:-1] + edges[1:] - 1) / 2, size - 1)
+        indices = numpy.empty(threshold, dtype=numpy.int64)
+        indices[0], indices[-1] = 0, size - 1
+        a = 0
+        for i in range(threshold - 2):
+            start, end = edges[i], edges[i + 1]
+            x = numpy.arange(start, end)
+            area = numpy.abs(
+                (a - avg_x[i + 1]) * (y[start:end] - y[a])
+                - (a - x) * (avg_y[i + 1] - y[a])
+            )
+            a = start + int(area.argmax())
+            indices[i + 1] = a
+        return indices
+    indices = array("L", [0])
+    edges.append(size)  # the last point is the bucket after the last one
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = edges[i + 1], edges[i + 2]
+        avg_x = (next_start + next_end - 1) / 2
+        avg_y = sum(points[next_start:next_end]) / (next_end - next_start)
+        y_a = points[a]
+        areas = [
+            abs((a - avg_x) * (points[j] - y_a) - (a - j) * (avg_y - y_a))
+            for j in range(start, end)
+        ]
+        a = start + areas.index(max(areas))
+        indices.append(a)
+    indices.append(size - 1)
+    return indices
+
+
+def decimate(
+    points: Sequence[int], decimation: Decimation
+) -> Tuple[Sequence[int], Sequence[int]]:
+    """
+    (indices, values) of the points kept. A trace already small enough is kept
+    whole.
+    """
+    size = len(points)
+    if size <= decimation.points or size < 3:
+        indices = numpy.arange(size) if numpy is not None else array("L", range(size))
+    elif DecimationMethod(decimation.method) == DecimationMethod.lttb:
+        indices = lttb_indices(points, decimation.points)
+    else:
+        indices = minmax_indices(points, decimation.points)
+    if numpy is not None:
+        return indices, numpy.asarray(points)[indices]
+    return indices, array("H", (points[i] for i in indices))
@@ -0,0 +1,219 @@
+"""
+Encode the blocks in JSON, XML and CBOR, without `dataclasses.asdict`.
+
+The blocks are converted once to plain values (dict, list, str, numbers) with
+the fields of each dataclass computed once per class. Enums, datetimes and
+other values are converted to their `str`. Numeric buffers (the points of the
+traces, the sample indices) are not converted element by element, they become
+a `TypedArray` of little-endian bytes:
+
+- JSON: {"dtype": "<u2", "base64": "..."}
+- CBOR: the typed array tag of RFC 8746 (69 for little-endian uint16)
+- XML: base64 text with a dtype attribute
+"""
+
+import base64
+import json
+import re
+import sys
+from array import array
+from dataclasses import dataclass, fields, is_dataclass
+from datetime import datetime
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+import cbor2 as cbor
+
+from otdr.block_data_structure import BaseBlockData, EventTable, ProprietaryBlock
+from otdr.type_parser import numpy
+
+# RFC 8746 tags of little-endian typed arrays, by numpy kind and size
+CBOR_TYPED_ARRAY_TAGS = {
+    "<u1": 64,
+    "<u2": 69,
+    "<u4": 70,
+    "<u8": 71,
+    "<i1": 72,
+    "<i2": 77,
+    "<i4": 78,
+    "<i8": 79,
+    "<f2": 84,
+    "<f4": 85,
+    "<f8": 86,
+}
+XML_NAME = re.compile(r"^(?![Xx][Mm][Ll])[A-Za-z_][\w.-]*$")
+XML_HEADER = b'<?xml version="1.0" encoding="UTF-8" ?>'
+
+
+@dataclass
+class TypedArray:
+    """
+    A numeric buffer: numpy style `dtype` ("<u2") and its little-endian bytes.
+    """
+
+    dtype: str
+    data: bytes
+
+    @classmethod
+    def from_buffer(cls, values) -> "TypedArray":
+        """
+        From a numpy array, an array.array or a memoryview.
+        """
+        if numpy is not None and isinstance(values, numpy.ndarray):
+            dtype = f"<{values.dtype.kind}{values.dtype.itemsize}"
+            return cls(dtype, values.astype(dtype, copy=False).tobytes())
+        if isinstance(values, bytes):
+            return cls("<u1", values)
+        typecode = (
+            values.typecode if isinstance(values, array) else values.format.lstrip("@=")
+        )
+        kind = "f" if typecode in "fd" else "i" if typecode.islower() else "u"
+        dtype = f"<{kind}{values.itemsize}"
+        if sys.byteorder == "little":
+            return cls(dtype, bytes(values))
+        swapped = array(typecode, bytes(values))
+        swapped.byteswap()
+        return cls(dtype, swapped.tobytes())
+
+    def base64(self) -> str:
+        return base64.b64encode(self.data).decode("ascii")
+
+
+def _is_buffer(value) -> bool:
+    if numpy is not None and isinstance(value, numpy.ndarray):
+        return True
+    return isinstance(value, (array, memoryview, bytes))
+
+
+@lru_cache(maxsize=None)
+def _field_names(cls: type) -> Tuple[str, ...]:
+    return tuple(field.name for field in fields(cls))
+
+
+def to_plain(value: Any, include_data_points: bool = True) -> Any:
+    """
+    `value` with dataclasses converted to dicts, like `dataclasses.asdict`,
+    and everything else converted to what JSON, XML and CBOR can encode.
+    Buffers are converted to `TypedArray`, or None without
+    `include_data_points`.
+    """
+    if isinstance(value, (Enum, datetime)):
+        return str(value)
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if numpy is not None and isinstance(value, numpy.generic):
+        return value.item()
+    if isinstance(value, EventTable):
+        return [to_plain(record) for record in value.to_records()]
+    if _is_buffer(value):
+        if not include_data_points:
+            return None
+        if numpy is not None and getattr(value, "ndim", 1) > 1:
+            return [TypedArray.from_buffer(row) for row in value]
+        return TypedArray.from_buffer(value)
+    if is_dataclass(value):
+        return {
+            name: to_plain(getattr(value, name), include_data_points)
+            for name in _field_names(type(value))
+        }
+    if isinstance(value, dict):
+        return {
+            str(key): to_plain(item, include_data_points) for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [to_plain(item, include_data_points) for item in value]
+    return str(value)
+
+
+def blocks_to_plain(
+    blocks: Iterable[Optional[BaseBlockData]], include_data_points: bool = True
+) -> Dict[str, Any]:
+    """
+    {block class name: block as plain values}, blocks are not modified.
+    Proprietary blocks are keyed by their name.
+    """
+    return {
+        (
+            block.name if isinstance(block, ProprietaryBlock) else type(block).__name__
+        ): to_plain(block, include_data_points)
+        for block in blocks
+        if block
+    }
+
+
+def json_default(value: Any) -> Any:
+    if isinstance(value, TypedArray):
+        return {"dtype": value.dtype, "base64": value.base64()}
+    return str(value)
+
+
+def cbor_default(encoder: cbor.CBOREncoder, value: Any) -> None:
+    if isinstance(value, TypedArray):
+        encoder.encode(cbor.CBORTag(CBOR_TYPED_ARRAY_TAGS[value.dtype], value.data))
+    else:
+        encoder.encode(str(value))
+
+
+def dumps_json(plain: Any, indent: Optional[int] = 2) -> str:
+    separators = None if indent else (",", ":")
+    return json.dumps(plain, indent=indent, separators=separators, default=json_default)
+
+
+def dumps_cbor(plain: Any) -> bytes:
+    return cbor.dumps(plain, default=cbor_default)
+
+
+def _xml_type(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, TypedArray):
+        return "array"
+    return {bool: "bool", int: "int", float: "float", str: "str"}.get(
+        type(value), "dict" if isinstance(value, dict) else "list"
+    )
+
+
+def _xml_element(tag: str, value: Any, out: List[str]) -> None:
+    kind = _xml_type(value)
+    attributes = f'type="{kind}"'
+    if not XML_NAME.match(tag):  # file names of batch results
+        attributes = f"name={quoteattr(tag)} {attributes}"
+        tag = "key"
+    if kind == "dict":
+        out.append(f"<{tag} {attributes}>")
+        for key, item in value.items():
+            _xml_element(key, item, out)
+        out.append(f"</{tag}>")
+    elif kind == "list":
+        out.append(f"<{tag} {attributes}>")
+        for item in value:
+            _xml_element("item", item, out)
+        out.append(f"</{tag}>")
+    elif kind == "array":
+        dtype = quoteattr(value.dtype)
+        out.append(
+            f'<{tag} {attributes} dtype={dtype} encoding="base64">'
+            f"{value.base64()}</{tag}>"
+        )
+    elif kind == "null":
+        out.append(f"<{tag} {attributes}></{tag}>")
+    else:
+        text = str(value).lower() if kind == "bool" else str(value)
+        out.append(f"<{tag} {attributes}>{escape(text)}</{tag}>")
+
+
+def dumps_xml(plain: Dict[str, Any]) -> bytes:
+    """
+    The layout of dicttoxml: a root element, one element per key with the type
+    of its value, "item" elements in lists.
+    """
+    out = ["<root>"]
+    for key, value in plain.items():
+        _xml_element(key, value, out)
+    out.append("</root>")
+    return XML_HEADER + "".join(out).encode("utf-8")
+
+
+ENCODERS = {"JSON": dumps_json, "XML": dumps_xml, "CBOR": dumps_cbor}
@@ -1,163 +1,346 @@
 import logging
+import mmap
+import os
 from abc import ABC
+from collections.abc import Mapping
 from io import IOBase
-from pathlib import Path
-from typing import BinaryIO, List, Type, Union
+from typing import BinaryIO, Dict, Iterator, List, Optional, Set, Union
 
 from otdr.block_data_structure import BaseBlockData, Block, MapBlock
 from otdr.block_parsers import (
-    CksumParserV1,
-    CksumParserV2,
-    DataPtsParserV1,
-    DataPtsParserV2,
-    FxdParamsParserV1,
-    FxdParamsParserV2,
-    GenParamsParserV1,
-    GenParamsParserV2,
-    KeyEventsParserV1,
-    KeyEventsParserV2,
-    LnkParamsParser,
-    MapBlockParser,
-    ProprietaryBlockParser,
-    SupParamsParserV1,
-    SupParamsParserV2,
+    ChecksumError,
+    ChecksumMode,
+    ParserRegistry,
+    read_map_block,
 )
 from otdr.block_parsers.abstract_parser import BlockParser
-from otdr.type_parser import StringParser
+from otdr.buffer_reader import BufferReader, BytesLike
+from otdr.decimation import Decimation
 
 logger = logging.getLogger(__name__)
 
+SorFile = Union[BinaryIO, str, os.PathLike, BytesLike]
+
+
+def open_sor_file(sor_file: SorFile, use_mmap: bool = False) -> BinaryIO:
+    """
+    Return a file object for sor_file, a path (str or Path), a file object or
+    a bytes-like object. Bytes-like objects (bytes, bytearray, memoryview,
+    mmap) and files opened with `use_mmap` are parsed in place through a
+    `BufferReader`.
+    """
+    if isinstance(sor_file, (str, os.PathLike)):
+        if use_mmap:
+            return BufferReader.from_mmap(sor_file)
+        return open(sor_file, "rb")
+    elif isinstance(sor_file, IOBase):
+        return sor_file
+    elif isinstance(sor_file, (bytes, bytearray, memoryview, mmap.mmap)):
+        return BufferReader(sor_file)
+    raise TypeError(
+        f"Argument sor_file should be a filename, a file object or a buffer. Got {type(sor_file)}"
+    )
+
+
+def create_block_parser(
+    version: int,
+    block: Block,
+    fh: BinaryIO,
+    checksum: ChecksumMode = ChecksumMode.lazy,
+    decimation: Optional[Decimation] = None,
+    vendor: Optional[str] = None,
+) -> Optional[BlockParser]:
+    """
+    Parser of a block of the map, None if the block has no parser or is
+    skipped, see `ParserRegistry`.
+    """
+    parser_class = ParserRegistry.lookup(block.name, version, vendor)
+    if parser_class is None:
+        return None
+    return parser_class.from_block(fh, block, checksum=checksum, decimation=decimation)
+
 
 class ParserFactory:
     """return a SorParserV1 or V2"""
 
     @staticmethod
-    def create_parser(sor_file: Union[BinaryIO, Path]) -> "BaseSorParser":
+    def create_parser(
+        sor_file: SorFile,
+        use_mmap: bool = False,
+        checksum: ChecksumMode = ChecksumMode.lazy,
+        decimation: Optional[Decimation] = None,
+    ) -> "BaseSorParser":
         """
-        Create a parser based on the
-        """
-        #        if isinstance(sor_file, Path):
-        #            filehandle = open(sor_file, "rb")
-        #        else:
-        #            filehandle = sor_file
+        Create a parser based on the version found at the start of the file.
+        With `use_mmap` the file is memory mapped and parsed without copy.
+        `checksum` is a `ChecksumMode` (or its value) for the Cksum block.
+        With a `decimation` DataPts traces are reduced for display.
 
-        return VersionParser(filehandle).parse()
+        A file opened from a path is closed by `parser.close()`, use the
+        parser as a context manager:
+
+            with ParserFactory.create_parser(path) as parser:
+                key_events = parser["KeyEvents"]
+        """
+        fh = open_sor_file(sor_file, use_mmap)
+        try:
+            parser = VersionParser(fh, checksum, decimation).parse()
+        except BaseException:
+            if fh is not sor_file:
+                fh.close()
+            raise
+        parser.closefd = fh is not sor_file
+        return parser
 
 
 class BaseSorParser(ABC):
+    """
+    Blocks are parsed from the file on first access: the file is open until
+    `close()`, which only closes it if the parser opened it (from a path).
+    """
+
     version: int = 0
     filename: str
     filehandle: BinaryIO
+    closefd: bool
+    vendor: Optional[str]
     part_parser: "PartParser"
     map_block: MapBlock
+    checksum: ChecksumMode
+    decimation: Optional[Decimation]
 
-    def __init__(self, sor_file: Union[BinaryIO, Path]):
-        if isinstance(sor_file, Path):
-            self.filehandle = open(sor_file, "rb")
-        elif isinstance(sor_file, IOBase):
-            self.filehandle = sor_file
-        else:
-            raise TypeError(
-                f"Argument sor_file should be a filename or a file object. Got {type(sor_file)}"
-            )
+    def __init__(
+        self,
+        sor_file: SorFile,
+        use_mmap: bool = False,
+        checksum: ChecksumMode = ChecksumMode.lazy,
+        decimation: Optional[Decimation] = None,
+    ):
+        self.filehandle = open_sor_file(sor_file, use_mmap)
+        self.closefd = self.filehandle is not sor_file
+        self.vendor = None
+        self.checksum = ChecksumMode(checksum)
+        self.decimation = decimation
         self.part_parser = PartParser()
 
+    def _register_parsers(self, map_block: Optional[MapBlock]):
+        """
+        Parse the map block if not given, register a parser for each block.
+        """
+        try:
+            if map_block is None:
+                self.filehandle.seek(0)
+                _, map_block = read_map_block(self.filehandle.read)
+            self.map_block = map_block
+            for block in self.map_block.blocks:
+                parser = self._find_parser_for_block(block)
+                # if a parser exists for this
+                if parser:
+                    self.part_parser.register_parser(block.name, parser)
+            self._register_vendor_parsers()
+            self._verify_checksum()
+        except BaseException:
+            self.close()
+            raise
+
+    def _register_vendor_parsers(self):
+        """
+        Blocks with vendor specific parsers: parse SupParams for the vendor
+        and replace (or remove) their parser.
+        """
+        blocks = [
+            block
+            for block in self.map_block.blocks
+            if ParserRegistry.has_vendor_parsers(block.name, self.version)
+        ]
+        if not blocks or "SupParams" not in self.part_parser:
+            return
+        self.vendor = ParserRegistry.vendor_of(self["SupParams"].supplier)
+        if self.vendor is None:
+            return
+        for block in blocks:
+            parser = self._find_parser_for_block(block)
+            if parser:
+                self.part_parser.register_parser(block.name, parser)
+            else:
+                self.part_parser.parsers.pop(block.name, None)
+        parsers = self.part_parser.parsers
+        # back in the order of the map
+        self.part_parser.parsers = {
+            block.name: parsers[block.name]
+            for block in self.map_block.blocks
+            if block.name in parsers
+        }
+
+    def close(self):
+        if self.closefd:
+            self.filehandle.close()
+
+    def __enter__(self) -> "BaseSorParser":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _find_parser_for_block(self, block: Block) -> Optional[BlockParser]:
+        return create_block_parser(
+            self.version,
+            block,
+            self.filehandle,
+            self.checksum,
+            self.decimation,
+            self.vendor,
+        )
+
+    def _verify_checksum(self):
+        """
+        In strict mode, check the checksum as soon as the file is opened.
+        """
+        if self.checksum != ChecksumMode.strict or "Cksum" not in self.blocks:
+            return
+        cksum = self["Cksum"]
+        if not cksum.match:
+            raise ChecksumError(
+                f"Checksum of the file is {cksum.file_checksum}, computed {cksum.computed_checksum}"
+            )
+
+    @property
+    def blocks(self) -> "PartParser":
+        """
+        Blocks of the file keyed by name, parsed on first access.
+        """
+        return self.part_parser
+
+    def __getitem__(self, block_name: str) -> BaseBlockData:
+        return self.part_parser[block_name]
+
     def parse(self) -> List[BaseBlockData]:
         parsed = self.part_parser.parse()
         parsed.append(self.map_block)
         return parsed
 
 
-class PartParser:
+class PartParser(Mapping):
     """
     Pass all parser to this class and return parsed data.
+
+    Parsers are keyed by block name: a block is only parsed the first time it
+    is accessed (`part_parser["KeyEvents"]`), then the result is cached.
+
+    It is also the parse context of the block parsers: the blocks a parser
+    `requires` are parsed (once) before it, so blocks are always parsed in
+    dependency order whatever the order of access.
     """
 
-    parsers: List[BlockParser]
+    parsers: Dict[str, BlockParser]
+    parsed: Dict[str, BaseBlockData]
+    parsing: Set[str]
 
     def __init__(self):
-        self.parsers = list()
+        self.parsers = dict()
+        self.parsed = dict()
+        self.parsing = set()
+
+    def register_parser(self, block_name: str, parser: BlockParser):
+        parser.context = self
+        self.parsers[block_name] = parser
+
+    def __getitem__(self, block_name: str) -> BaseBlockData:
+        if block_name not in self.parsed:
+            parser = self.parsers[block_name]
+            if block_name in self.parsing:
+                raise ValueError(f"Circular dependency between blocks on {block_name}")
+            self.parsing.add(block_name)
+            try:
+                for required in parser.requires:
+                    if required in self.parsers:
+                        self[required]
+                self.parsed[block_name] = parser.parse()
+            finally:
+                self.parsing.discard(block_name)
+        return self.parsed[block_name]
 
-    def register_parser(self, parser: BlockParser):
-        self.parsers.append(parser)
+    def __contains__(self, block_name: object) -> bool:
+        # Mapping.__contains__ would parse the block
+        return block_name in self.parsers
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.parsers)
+
+    def __len__(self) -> int:
+        return len(self.parsers)
 
     def parse(self) -> List[BaseBlockData]:
-        return [p.parse() for p in self.parsers]
+        return [self[block_name] for block_name in self.parsers]
 
 
 class SorParserV1(BaseSorParser):
     version: int = 1
 
-    def __init__(self, sor_file: Union[BinaryIO, Path]):
-        super().__init__(sor_file)
-        self.map_block = MapBlockParser(self.filehandle).parse()
-        for block in self.map_block.blocks:
-            parser = self._find_parser_for_block(block)
-            # if a parser exists for this
-            if parser:
-                self.part_parser.register_parser(parser)
-
-    def _find_parser_for_block(self, block: Block) -> BlockParser:
-        blocks = {
-            "Cksum": CksumParserV1,
-            "DataPts": DataPtsParserV1,
-            "GenParams": GenParamsParserV1,
-            "SupParams": SupParamsParserV1,
-            "FxdParams": FxdParamsParserV1,
-            "KeyEvents": KeyEventsParserV1,
-            "LnkParams": LnkParamsParser,
-            "ProprietaryBlock": ProprietaryBlockParser,
-        }
-        for name, parser_class in blocks.items():
-            if block.name == name:
-                return parser_class(self.filehandle, block.position)
+    def __init__(
+        self,
+        sor_file: SorFile,
+        use_mmap: bool = False,
+        checksum: ChecksumMode = ChecksumMode.lazy,
+        decimation: Optional[Decimation] = None,
+        map_block: Optional[MapBlock] = None,
+    ):
+        """
+        `map_block` is given when it has already been read, see `VersionParser`.
+        """
+        super().__init__(sor_file, use_mmap, checksum, decimation)
+        self._register_parsers(map_block)
 
 
 class SorParserV2(BaseSorParser):
     version: int = 2
     map_block: MapBlock
 
-    def __init__(self, sor_file: Union[BinaryIO, Path]):
-        super().__init__(sor_file)
-        self.map_block = MapBlockParser(self.filehandle, 4).parse()
-        for block in self.map_block.blocks:
-            parser = self._find_parser_for_block(block)
-            # if a parser exists for this
-            if parser:
-                self.part_parser.register_parser(parser)
-
-    def _find_parser_for_block(self, block: Block) -> BlockParser:
-        blocks = {
-            "Cksum": CksumParserV2,
-            "DataPts": DataPtsParserV2,
-            "GenParams": GenParamsParserV2,
-            "SupParams": SupParamsParserV2,
-            "FxdParams": FxdParamsParserV2,
-            "KeyEvents": KeyEventsParserV2,
-            "LnkParams": LnkParamsParser,
-            "ProprietaryBlock": ProprietaryBlockParser,
-        }
-        for name, parser_class in blocks.items():
-            if block.name == name:
-                return parser_class(self.filehandle, block.position)
+    def __init__(
+        self,
+        sor_file: SorFile,
+        use_mmap: bool = False,
+        checksum: ChecksumMode = ChecksumMode.lazy,
+        decimation: Optional[Decimation] = None,
+        map_block: Optional[MapBlock] = None,
+    ):
+        """
+        `map_block` is given when it has already been read, see `VersionParser`.
+        """
+        super().__init__(sor_file, use_mmap, checksum, decimation)
+        self._register_parsers(map_block)
 
 
 class VersionParser:
     """
     Parse the version based on the first bytes of the sor file. If the file
     starts with a "Map" string then the format is v2, else it's v1.
+
+    The start of the file is read once: the map block is parsed from the same
+    bytes and given to the parser.
     """
 
     filehandle: BinaryIO
+    checksum: ChecksumMode
+    decimation: Optional[Decimation]
 
-    def __init__(self, fh: BinaryIO) -> None:
+    def __init__(
+        self,
+        fh: BinaryIO,
+        checksum: ChecksumMode = ChecksumMode.lazy,
+        decimation: Optional[Decimation] = None,
+    ):
         self.filehandle = fh
+        self.checksum = checksum
+        self.decimation = decimation
         fh.seek(0)
 
     def parse(self) -> BaseSorParser:
-        res = StringParser(self.filehandle).parse()
-        self.filehandle.seek(0)  # ensure we are returning at the begining of the file
-        if res == "Map":
-            return SorParserV2(self.filehandle)
-        else:
-            return SorParserV1(self.filehandle)
+        version, map_block = read_map_block(self.filehandle.read)
+        parser_class = SorParserV2 if version == 2 else SorParserV1
+        return parser_class(
+            self.filehandle,
+            checksum=self.checksum,
+            decimation=self.decimation,
+            map_block=map_block,
+        )
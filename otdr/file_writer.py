@@ -0,0 +1,261 @@
+import binascii
+import logging
+import struct
+import sys
+from array import array
+from functools import partial
+from typing import BinaryIO, Iterable, List, Optional, Sequence, Tuple
+
+from otdr.block_data_structure import (
+    BaseBlockData,
+    DataPoints,
+    FxdParams,
+    GenParams,
+    KeyEvents,
+    SupParams,
+)
+from otdr.block_parsers.checksum import CRC_CCITT_INIT
+from otdr.block_parsers.fxd_params import FXD_PARAMS_LAYOUT_V1, FXD_PARAMS_LAYOUT_V2
+from otdr.block_parsers.key_events import (
+    EVENT_LAYOUT_V1,
+    EVENT_LAYOUT_V2,
+    SUMMARY_LAYOUT,
+    distance_factor,
+)
+from otdr.block_parsers.map_block import MAP_ENTRY_LAYOUT, MAP_HEADER_LAYOUT
+from otdr.type_parser import numpy
+
+logger = logging.getLogger("pyOTDR")
+
+
+def _string(value: Optional[str]) -> bytes:
+    return (value or "").encode("utf-8") + b"\0"
+
+
+def _fixed(value: Optional[str], size: int) -> bytes:
+    return (value or "").encode("ascii")[:size].ljust(size, b" ")
+
+
+def _points_bytes(points: Sequence[int]) -> bytes:
+    """
+    Little endian uint16 bytes of a numpy array, array("H"), memoryview or list.
+    """
+    if numpy is not None and isinstance(points, numpy.ndarray):
+        return points.astype("<u2", copy=False).tobytes()
+    result = array("H", points)
+    if sys.byteorder == "big":
+        result.byteswap()
+    return result.tobytes()
+
+
+class SorWriter:
+    """
+    Serialize blocks (GenParams, SupParams, FxdParams, KeyEvents and
+    DataPoints) to a sor file of `version` 1 or 2. The map block and the
+    checksum are computed, MapBlock and Cksum given in blocks are ignored.
+
+    Blocks that can't be decoded (proprietary...) can be copied as is with
+    `raw_blocks`, (name, content) pairs. In v2 content starts with the name.
+    """
+
+    version: int
+
+    def __init__(self, version: int = 2):
+        if version not in (1, 2):
+            raise ValueError(f"version should be 1 or 2, got {version}")
+        self.version = version
+
+    def dumps(
+        self,
+        blocks: Iterable[BaseBlockData],
+        raw_blocks: Iterable[Tuple[str, bytes]] = (),
+    ) -> bytes:
+        by_type = {type(b): b for b in blocks if b is not None}
+        fxd_params = by_type.get(FxdParams)
+        # distances of KeyEvents are scaled with the index, like KeyEventParser
+        factor = distance_factor(fxd_params.index) if fxd_params is not None else 1
+        encoded: List[Tuple[str, bytes]] = []
+        for name, data_class, encode in (
+            ("GenParams", GenParams, self._gen_params),
+            ("SupParams", SupParams, self._sup_params),
+            ("FxdParams", FxdParams, self._fxd_params),
+            ("DataPts", DataPoints, self._data_points),
+            ("KeyEvents", KeyEvents, partial(self._key_events, factor=factor)),
+        ):
+            if data_class in by_type:
+                encoded.append(
+                    (name, self._block_name(name) + encode(by_type[data_class]))
+                )
+        encoded.extend(raw_blocks)
+
+        cksum_name = self._block_name("Cksum")
+        entries = encoded + [("Cksum", cksum_name + b"\0\0")]
+        block_version = 100 * self.version
+        map_entries = b"".join(
+            _string(name)
+            + MAP_ENTRY_LAYOUT.pack({"version": block_version, "size": len(data)})
+            for name, data in entries
+        )
+        map_name = self._block_name("Map")
+        map_block = map_name + MAP_HEADER_LAYOUT.pack(
+            {
+                "version": block_version,
+                "size": len(map_name) + MAP_HEADER_LAYOUT.size + len(map_entries),
+                "number_of_block": len(entries) + 1,
+            }
+        )
+        content = b"".join([map_block, map_entries] + [d for _, d in encoded])
+        content += cksum_name
+        crc = binascii.crc_hqx(content, CRC_CCITT_INIT)
+        return content + struct.pack("<H", crc)
+
+    def dump(
+        self,
+        blocks: Iterable[BaseBlockData],
+        fh: BinaryIO,
+        raw_blocks: Iterable[Tuple[str, bytes]] = (),
+    ) -> None:
+        fh.write(self.dumps(blocks, raw_blocks))
+
+    def _block_name(self, name: str) -> bytes:
+        # In V2 each block starts with its name.
+        return _string(name) if self.version == 2 else b""
+
+    def _gen_params(self, gen_params: GenParams) -> bytes:
+        fiber_type = b""
+        if self.version == 2:
+            fiber_type = struct.pack("<H", gen_params.fiber_type.value)
+        user_offset_distance = b""
+        if self.version == 2:
+            user_offset_distance = struct.pack(
+                "<i", gen_params.user_offset_distance or 0
+            )
+        wavelength = gen_params.wavelength.value if gen_params.wavelength else 0
+        return b"".join(
+            [
+                _fixed(gen_params.language, 2),
+                _string(gen_params.cable_id),
+                _string(gen_params.fiber_id),
+                fiber_type,
+                struct.pack("<H", wavelength),
+                _string(gen_params.locationA),
+                _string(gen_params.locationB),
+                _string(gen_params.cable_code),
+                _fixed(gen_params.build_condition, 2),
+                struct.pack("<i", gen_params.user_offset or 0),
+                user_offset_distance,
+                _string(gen_params.operator),
+                _string(gen_params.comment),
+            ]
+        )
+
+    def _sup_params(self, sup_params: SupParams) -> bytes:
+        return b"".join(
+            _string(value)
+            for value in (
+                sup_params.supplier,
+                sup_params.OTDR,
+                sup_params.OTDR_serial_number,
+                sup_params.module,
+                sup_params.module_serial_number,
+                sup_params.software,
+                sup_params.other,
+            )
+        )
+
+    def _fxd_params(self, fxd: FxdParams) -> bytes:
+        values = {
+            "date_time": int(fxd.date_time.timestamp()),
+            "unit": _fixed(fxd.unit.name, 2),
+            "wavelength": round(fxd.wavelength.value * 10),
+            "acquisition_offset": fxd.acquisition_offset,
+            "number_of_pulse_width_entries": fxd.number_of_pulse_width_entries,
+            "pulse_width": fxd.pulse_width.value,
+            "sample_spacing": round(fxd.sample_spacing.value * 1e8),
+            "data_points": fxd.data_points,
+            "index": round(fxd.index * 1e5),
+            "BC": round(fxd.BC.value * -10),
+            "num_average": fxd.num_average,
+            "range": round(
+                (
+                    fxd.acquisition_range
+                    if fxd.acquisition_range is not None
+                    else fxd.range
+                )
+                / 2e-5
+            ),
+            "front_panel_offset": fxd.front_panel_offset,
+            "noise_floor_level": fxd.noise_floor_level,
+            "noise_floor_scaling_factor": fxd.noise_floor_scaling_factor,
+            "power_offset_first_point": fxd.power_offset_first_point,
+            "loss_threshold": round(fxd.loss_threshold.value * 1000),
+            "refl_threshold": round(fxd.refl_threshold.value * -1000),
+            "EOT_threshold": round(fxd.EOT_threshold.value * 1000),
+        }
+        if self.version == 1:
+            return FXD_PARAMS_LAYOUT_V1.pack(values)
+        values.update(
+            acquisition_offset_distance=fxd.acquisition_offset_distance or 0,
+            averaging_time=round((fxd.averaging_time or 0) * 10),
+            acquisition_range_distance=fxd.acquisition_range_distance or 0,
+            trace_type=_fixed(fxd.trace_type or "ST", 2),
+            X1=fxd.X1 or 0,
+            Y1=fxd.Y1 or 0,
+            X2=fxd.X2 or 0,
+            Y2=fxd.Y2 or 0,
+        )
+        return FXD_PARAMS_LAYOUT_V2.pack(values)
+
+    def _data_points(self, data_points: DataPoints) -> bytes:
+        if data_points.sample_indices is not None:
+            raise ValueError("Decimated DataPoints can't be written in a sor file")
+        if data_points.traces is not None:
+            traces = list(data_points.traces)
+            scaling_factors = data_points.scaling_factors
+        else:
+            points = data_points.points if data_points.points is not None else []
+            traces = [points]
+            scaling_factors = [data_points.scaling_factor]
+        data = [struct.pack("<Ih", sum(len(t) for t in traces), len(traces))]
+        for trace, scaling_factor in zip(traces, scaling_factors):
+            data.append(struct.pack("<IH", len(trace), round(scaling_factor * 1000)))
+            data.append(_points_bytes(trace))
+        return b"".join(data)
+
+    def _key_events(self, key_events: KeyEvents, factor: float) -> bytes:
+        layout = EVENT_LAYOUT_V2 if self.version == 2 else EVENT_LAYOUT_V1
+        data = [struct.pack("<H", len(key_events.events))]
+        for number, event in enumerate(key_events.events, 1):
+            values = {
+                "number": number,
+                "distance": round(event.distance / factor),
+                "slope": round(event.slope * 1000),
+                "splice_loss": round(event.splice_loss * 1000),
+                "refl_loss": round(event.refl_loss * 1000),
+                "type": _fixed(event.type.reference, 8),
+            }
+            if self.version == 2:
+                for name in (
+                    "end_of_previous",
+                    "start_of_current",
+                    "end_of_current",
+                    "start_of_next",
+                    "peak",
+                ):
+                    values[name] = round((getattr(event, name) or 0) / factor)
+            data.append(layout.pack(values))
+            data.append(_string(event.comment))
+        summary = key_events.summary
+        data.append(
+            SUMMARY_LAYOUT.pack(
+                {
+                    "total_loss": round(summary.total_loss * 1000),
+                    "loss_start": round(summary.loss_start / factor),
+                    "loss_end": round(summary.loss_end / factor),
+                    "ORL": round(summary.ORL * 1000),
+                    "ORL_start": round(summary.ORL_start / factor),
+                    "ORL_finish": round(summary.ORL_finish / factor),
+                }
+            )
+        )
+        return b"".join(data)
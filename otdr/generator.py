@@ -0,0 +1,164 @@
+"""
+Randomized but plausible sor files, of any size, to build load-test corpora
+without customer traces.
+"""
+
+import random
+from array import array
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from otdr.block_data_structure import (
+    BaseBlockData,
+    DataPoints,
+    DBValue,
+    Event,
+    EventDataType,
+    EventModeType,
+    EventType,
+    FiberType,
+    FxdParams,
+    GenParams,
+    KeyEvents,
+    KeyEventSummary,
+    LengthUnit,
+    NmValue,
+    NsValue,
+    SupParams,
+    UsValue,
+)
+from otdr.block_parsers.fxd_params import resolution
+from otdr.file_writer import SorWriter
+
+SAMPLE_SPACING_NS = 25
+# points are 0.001 dB below the max: they grow with the loss along the fiber
+LAUNCH_LEVEL = 5000
+NOISE_FLOOR = 60000
+
+
+def _trace(points: int, event_samples: List[int], rnd: random.Random) -> array:
+    trace = array("H", bytes(2 * points))
+    attenuation = rnd.uniform(0.05, 0.2)  # per sample
+    level = float(LAUNCH_LEVEL)
+    events = iter(sorted(event_samples) + [points])
+    next_event = next(events)
+    end = max(event_samples, default=points)
+    for i in range(points):
+        if i == next_event:
+            level += rnd.uniform(50, 500)  # splice loss
+            next_event = next(events)
+        value = level + rnd.gauss(0, 20) if i <= end else NOISE_FLOOR
+        trace[i] = min(65535, max(0, int(value)))
+        level += attenuation
+    return trace
+
+
+def random_blocks(
+    points: int = 16000, events: int = 10, seed: Optional[int] = None
+) -> List[BaseBlockData]:
+    """
+    Blocks of a random acquisition with `points` samples and `events` events.
+    """
+    rnd = random.Random(seed)
+    event_samples = sorted(rnd.sample(range(points), min(events, points)))
+    index = round(rnd.uniform(1.46, 1.48), 5)
+    step = resolution(SAMPLE_SPACING_NS / 1000, index) / 1000  # km per point
+    key_events = [
+        Event(
+            comment=f"event {i}",
+            distance=sample * step,
+            peak=(sample + 2) * step,
+            refl_loss=-round(rnd.uniform(30, 60), 3),
+            slope=round(rnd.uniform(0.1, 0.4), 3),
+            splice_loss=round(rnd.uniform(0, 0.5), 3),
+            end_of_previous=max(0, sample - 4) * step,
+            start_of_current=sample * step,
+            end_of_current=(sample + 4) * step,
+            start_of_next=(sample + 8) * step,
+            type=EventDataType("0F9999LS", EventType.loss_drop_gain, EventModeType.F),
+        )
+        for i, sample in enumerate(event_samples)
+    ]
+    if key_events:
+        key_events[-1].type = EventDataType(
+            "1E9999LS", EventType.reflection, EventModeType.E
+        )
+    end = event_samples[-1] * step if event_samples else 0
+    return [
+        GenParams(
+            language="EN",
+            cable_id=f"CABLE-{rnd.randint(1, 9999)}",
+            fiber_id=f"{rnd.randint(1, 288)}",
+            cable_code="",
+            wavelength=NmValue(1550),
+            comment="synthetic trace",
+            fiber_type=FiberType.G652,
+            build_condition="BC",
+            locationA="A",
+            locationB="B",
+            operator="pyOTDR",
+            user_offset=0,
+            user_offset_distance=0,
+        ),
+        SupParams(
+            supplier="pyOTDR",
+            OTDR="generator",
+            OTDR_serial_number=f"{rnd.randint(0, 10 ** 6):06d}",
+            module="SM",
+            module_serial_number=f"{rnd.randint(0, 10 ** 6):06d}",
+            software="1.0",
+            other="",
+        ),
+        FxdParams(
+            BC=DBValue(-80.0),
+            EOT_threshold=DBValue(3.0),
+            acquisition_offset=0,
+            date_time=datetime.fromtimestamp(
+                rnd.randint(10**9, 2 * 10**9), timezone.utc
+            ),
+            front_panel_offset=0,
+            index=index,
+            loss_threshold=DBValue(0.2),
+            noise_floor_level=NOISE_FLOOR,
+            noise_floor_scaling_factor=1000,
+            num_average=rnd.randint(1, 30000),
+            data_points=points,
+            number_of_pulse_width_entries=1,
+            power_offset_first_point=0,
+            pulse_width=NsValue(rnd.choice([10, 100, 1000])),
+            range=step * points,
+            refl_threshold=DBValue(-40.0),
+            resolution=step * 1000,
+            sample_spacing=UsValue(SAMPLE_SPACING_NS / 1000),
+            unit=LengthUnit.km,
+            wavelength=NmValue(1550.0),
+        ),
+        KeyEvents(
+            KeyEventSummary(
+                ORL=round(rnd.uniform(25, 45), 3),
+                ORL_start=0,
+                ORL_finish=end,
+                loss_start=0,
+                loss_end=end,
+                total_loss=round(sum(e.splice_loss for e in key_events), 3),
+            ),
+            key_events,
+        ),
+        DataPoints(
+            max_before_offset=0,
+            min_before_offset=0,
+            data_points=points,
+            num_traces=1,
+            scaling_factor=1.0,
+            points=_trace(points, event_samples, rnd),
+        ),
+    ]
+
+
+def random_sor(
+    points: int = 16000, events: int = 10, version: int = 2, seed: Optional[int] = None
+) -> bytes:
+    """
+    A valid random sor file, see `random_blocks`.
+    """
+    return SorWriter(version).dumps(random_blocks(points, events, seed))
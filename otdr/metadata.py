@@ -0,0 +1,104 @@
+import logging
+import os
+from dataclasses import dataclass
+from io import IOBase
+from typing import BinaryIO, Dict, Iterable, Union
+
+from otdr.block_data_structure import BaseBlockData, MapBlock
+from otdr.block_parsers import read_map_block
+from otdr.buffer_reader import BytesLike
+from otdr.file_parser import ParserFactory
+
+logger = logging.getLogger("pyOTDR")
+
+# First read, big enough for the map block of most files.
+PREFIX_SIZE = 1024
+
+
+@dataclass
+class SorMetadata:
+    """
+    Blocks read by `scan_metadata`, keyed by block name.
+    """
+
+    version: int
+    map_block: MapBlock
+    blocks: Dict[str, BaseBlockData]
+
+
+class PrefixReader:
+    """
+    Read the start of a sor file, growing the prefix only when needed.
+    Buffers are already in memory, they are used as is.
+    """
+
+    def __init__(self, sor_file: Union[str, os.PathLike, BinaryIO, BytesLike]):
+        self.filehandle = None
+        self.owned = isinstance(sor_file, (str, os.PathLike))
+        if self.owned:
+            self.filehandle = open(sor_file, "rb")
+            self.prefix = b""
+        elif isinstance(sor_file, IOBase):
+            self.filehandle = sor_file
+            self.filehandle.seek(0)
+            self.prefix = b""
+        else:
+            self.prefix = sor_file
+        self.position = 0
+
+    def read(self, size: int) -> bytes:
+        """
+        Next `size` bytes of the file, for `read_map_block`.
+        """
+        start = self.position
+        self.position += size
+        return bytes(
+            self.read_to(max(self.position, PREFIX_SIZE))[start : self.position]
+        )
+
+    def read_to(self, size: int) -> BytesLike:
+        if self.filehandle is not None and len(self.prefix) < size:
+            self.prefix += self.filehandle.read(size - len(self.prefix))
+        return self.prefix
+
+    def close(self):
+        if self.owned:
+            self.filehandle.close()
+
+
+def scan_metadata(
+    sor_file: Union[str, os.PathLike, BinaryIO, BytesLike],
+    blocks: Iterable[str] = ("GenParams", "SupParams"),
+) -> SorMetadata:
+    """
+    Parse only the requested blocks, reading the file up to the end of the
+    last of them: the map block gives their position and size, so DataPts and
+    Cksum (at the end of the file in practice) are never read.
+    Requested blocks missing from the file are ignored.
+    """
+    reader = PrefixReader(sor_file)
+    try:
+        _, map_block = read_map_block(reader.read)
+        map_size = map_block.size
+        prefix = reader.read_to(map_size)
+        # a parser on the prefix only parses the map block, then blocks on access
+        parser = ParserFactory.create_parser(prefix)
+        names = frozenset(blocks)
+        wanted = [b for b in parser.map_block.blocks if b.name in names]
+        # and the blocks they need to be decoded (FxdParams for KeyEvents)
+        needed = set(names)
+        for name in names & parser.blocks.keys():
+            needed.update(parser.blocks.parsers[name].requires)
+        end = max(
+            (b.position + b.size for b in parser.map_block.blocks if b.name in needed),
+            default=map_size,
+        )
+        if end > len(prefix):
+            parser = ParserFactory.create_parser(reader.read_to(end))
+        return SorMetadata(
+            version=parser.version,
+            map_block=parser.map_block,
+            blocks={b.name: parser[b.name] for b in wanted if b.name in parser.blocks},
+        )
+    finally:
+        reader.close()
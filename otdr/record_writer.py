@@ -0,0 +1,46 @@
+from abc import ABC, abstractmethod
+from typing import BinaryIO
+
+import cbor2 as cbor
+
+from otdr.encoder import cbor_default, dumps_json
+
+
+class RecordWriter(ABC):
+    """
+    Write records one by one in a binary stream, nothing is kept in memory.
+    """
+
+    stream: BinaryIO
+
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+
+    @abstractmethod
+    def write(self, record: dict) -> None:
+        pass
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+class NDJSONWriter(RecordWriter):
+    """
+    Newline delimited JSON, one record per line.
+    """
+
+    def write(self, record: dict) -> None:
+        line = dumps_json(record, indent=None)
+        self.stream.write(line.encode("utf-8") + b"\n")
+
+
+class CBORSequenceWriter(RecordWriter):
+    """
+    CBOR sequence (RFC 8742): CBOR items concatenated, without any framing.
+    """
+
+    def write(self, record: dict) -> None:
+        cbor.dump(record, self.stream, default=cbor_default)
+
+
+RECORD_WRITERS = {"NDJSON": NDJSONWriter, "CBORSEQ": CBORSequenceWriter}
@@ -0,0 +1,152 @@
+"""
+Parse a sor file from a forward-only stream (socket, pipe, HTTP body, tar
+member): nothing is seeked, the file doesn't need to be buffered.
+
+The map block gives the position and size of every block, each block is
+parsed as soon as its bytes are read (after the blocks it requires) and the
+checksum is computed on the fly.
+"""
+
+import binascii
+import logging
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from otdr.block_data_structure import BaseBlockData, Block, Cksum, MapBlock
+from otdr.block_parsers import (
+    ChecksumError,
+    ChecksumMode,
+    CksumParserV1,
+    CksumParserV2,
+    ParserRegistry,
+    read_map_block,
+)
+from otdr.block_parsers.checksum import CRC_CCITT_INIT
+from otdr.buffer_reader import BufferReader
+from otdr.decimation import Decimation
+from otdr.file_parser import PartParser, create_block_parser
+
+logger = logging.getLogger("pyOTDR")
+
+CKSUM_SIZE = 2  # the checksum itself, at the end of the Cksum block
+
+
+class StreamParser:
+    """
+    Iterate on (block name, block) in the order of the file, the map block
+    first. Blocks without parser are skipped (but part of the checksum).
+    """
+
+    stream: BinaryIO
+    checksum: ChecksumMode
+    decimation: Optional[Decimation]
+    version: int
+    map_block: MapBlock
+
+    def __init__(
+        self,
+        stream: BinaryIO,
+        checksum: ChecksumMode = ChecksumMode.lazy,
+        decimation: Optional[Decimation] = None,
+    ):
+        self.stream = stream
+        self.checksum = ChecksumMode(checksum)
+        self.decimation = decimation
+        self.position = 0
+        self.crc = CRC_CCITT_INIT
+
+    def _read(self, size: int, crc: bool = True) -> bytes:
+        chunks = []
+        remaining = size
+        while remaining > 0:
+            chunk = self.stream.read(remaining)
+            if not chunk:
+                raise ValueError(
+                    f"Stream ended at {self.position}, {remaining} bytes before the end of the block"
+                )
+            chunks.append(chunk)
+            remaining -= len(chunk)
+            self.position += len(chunk)
+        data = b"".join(chunks)
+        if crc:
+            self.crc = binascii.crc_hqx(data, self.crc)
+        return data
+
+    def _parse_map(self) -> MapBlock:
+        self.version, map_block = read_map_block(self._read)
+        return map_block
+
+    def _cksum(self, data: bytes) -> Cksum:
+        parser_class = CksumParserV2 if self.version == 2 else CksumParserV1
+        cksum = parser_class(BufferReader(data), 0, ChecksumMode.off).parse()
+        if self.checksum == ChecksumMode.off:
+            return cksum
+        cksum.computed_checksum = self.crc
+        cksum.match = cksum.file_checksum == self.crc
+        if self.checksum == ChecksumMode.strict and not cksum.match:
+            raise ChecksumError(
+                f"Checksum of the file is {cksum.file_checksum}, computed {self.crc}"
+            )
+        return cksum
+
+    def _vendor(self, block: Block, part_parser: PartParser) -> Optional[str]:
+        """
+        Vendor for the parser of `block`, if it has vendor specific parsers
+        and SupParams is before it.
+        """
+        if not ParserRegistry.has_vendor_parsers(block.name, self.version):
+            return None
+        sup_params = part_parser.parsed.get("SupParams")
+        return (
+            None
+            if sup_params is None
+            else ParserRegistry.vendor_of(sup_params.supplier)
+        )
+
+    def __iter__(self) -> Iterator[Tuple[str, BaseBlockData]]:
+        self.map_block = self._parse_map()
+        yield "Map", self.map_block
+        blocks = sorted(self.map_block.blocks, key=lambda b: b.position)
+        in_map = {block.name for block in blocks}
+        part_parser = PartParser()
+        waiting: List[str] = []
+        arrived = set()
+        for block in blocks:
+            if block.position < self.position:
+                raise ValueError(f"Block {block.name} overlaps the previous one")
+            self._read(block.position - self.position)  # gap between blocks
+            if block.name == "Cksum":
+                data = self._read(block.size - CKSUM_SIZE)
+                data += self._read(CKSUM_SIZE, crc=False)
+                yield block.name, self._cksum(data)
+                continue
+            data = self._read(block.size)
+            arrived.add(block.name)
+            parser = create_block_parser(
+                self.version,
+                block,
+                BufferReader(data, block.position),
+                self.checksum,
+                self.decimation,
+                self._vendor(block, part_parser),
+            )
+            if parser is None:
+                logger.debug(f"No parser for block {block.name}")
+                continue
+            part_parser.register_parser(block.name, parser)
+            waiting.append(block.name)
+            # blocks whose requirements have arrived (or are not in the file)
+            for name in list(waiting):
+                requires = part_parser.parsers[name].requires
+                if all(r in arrived or r not in in_map for r in requires):
+                    waiting.remove(name)
+                    yield name, part_parser[name]
+        for name in waiting:
+            yield name, part_parser[name]
+
+    def parse(self) -> List[BaseBlockData]:
+        """
+        All the blocks, the map block last like `BaseSorParser.parse`.
+        """
+        blocks = [block for name, block in self if name != "Map"]
+        blocks.append(self.map_block)
+        return blocks
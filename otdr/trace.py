@@ -0,0 +1,59 @@
+"""
+Convert the raw DataPts points to a distance axis (km) and dB values, the way
+the trace is plotted: dB are relative to the lowest power point of the trace.
+"""
+
+from array import array
+from typing import Sequence, Tuple
+
+from otdr.block_data_structure import DataPoints, FxdParams
+from otdr.type_parser import numpy
+
+
+def distance_axis(fxd_params: FxdParams, count: int) -> Sequence[float]:
+    """
+    Distance of each of the `count` points in km.
+    """
+    step = fxd_params.resolution / 1000
+    if numpy is not None:
+        distances = numpy.arange(count, dtype=numpy.float64)
+        distances *= step
+        return distances
+    return array("d", (i * step for i in range(count)))
+
+
+def trace_db(data_points: DataPoints) -> Sequence[float]:
+    """
+    Points in dB, 0 being the lowest power point (the max raw value).
+    """
+    points = data_points.points if data_points.points is not None else []
+    if not len(points):
+        return array("d")
+    factor = 0.001 * data_points.scaling_factor
+    if data_points.sample_indices is not None:
+        # decimated, the max may not have been kept
+        max_point = round(data_points.max_before_offset / factor)
+    else:
+        max_point = max(points) if numpy is None else numpy.asarray(points).max()
+    if numpy is not None:
+        db = numpy.subtract(max_point, points, dtype=numpy.float64)
+        db *= factor
+        return db
+    return array("d", ((max_point - p) * factor for p in points))
+
+
+def trace_xy(
+    data_points: DataPoints, fxd_params: FxdParams
+) -> Tuple[Sequence[float], Sequence[float]]:
+    """
+    (distances in km, dB) of the whole trace, numpy arrays if numpy is
+    installed, array("d") otherwise.
+    """
+    db = trace_db(data_points)
+    if data_points.sample_indices is not None:
+        step = fxd_params.resolution / 1000
+        indices = data_points.sample_indices[0]
+        if numpy is not None:
+            return numpy.multiply(indices, step, dtype=numpy.float64), db
+        return array("d", (i * step for i in indices)), db
+    return distance_axis(fxd_params, len(db)), db
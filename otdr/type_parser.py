@@ -1,71 +1,195 @@
+import io
 import logging
 import struct
+import sys
+from array import array
+from typing import Any, BinaryIO, Dict, Optional, Tuple
 
 from otdr.base_parser import BaseParser
+from otdr.buffer_reader import STRING_SCAN_CHUNK, BufferReader
+
+try:
+    import numpy
+except ImportError:  # numpy is optional, fallback on array("H")
+    numpy = None
 
 logger = logging.getLogger("pyOTDR")
 
 # Abstract class to create Type parser (like Uint, Int, Float, Short etc...)
 TypeParser = BaseParser
 
+# default of an argument, to tell it apart from an explicit None
+_UNSET: Any = object()
+
 
 class StringParser(TypeParser):
     """
     In SOR file, string is ended when `\00` is present.
+
+    The terminator is looked for by chunk instead of byte by byte, and the file
+    is then seeked right after it. Strings which are not valid `encoding` are
+    decoded with `fallback_encoding` (set it to None to raise instead).
     """
 
+    encoding: str = "utf-8"
+    fallback_encoding: Optional[str] = "latin-1"
+
+    def __init__(
+        self,
+        filehandler: BinaryIO,
+        encoding: Optional[str] = None,
+        fallback_encoding: Optional[str] = _UNSET,
+    ):
+        super().__init__(filehandler)
+        if encoding is not None:
+            self.encoding = encoding
+        if fallback_encoding is not _UNSET:
+            self.fallback_encoding = fallback_encoding
+
     def parse(self) -> str:
-        result = b""
-        byte = self.filehandler.read(1)
-        while byte != "":
-            tt = struct.unpack("c", byte)[0]
-            if tt == b"\x00":
-                break
-            result += tt
-            byte = self.filehandler.read(1)
+        if isinstance(self.filehandler, BufferReader):
+            result, terminated = self.filehandler.read_until(b"\x00")
+        else:
+            result, terminated = self._read_until_nul()
+        if not terminated:
+            logger.warning(f"End of file reached in string {result!r}")
+        return self._decode(result)
+
+    def _read_until_nul(self) -> Tuple[bytes, bool]:
+        fh = self.filehandler
+        chunks = list()
+        while True:
+            chunk = fh.read(STRING_SCAN_CHUNK)
+            if not chunk:
+                return b"".join(chunks), False
+            end = chunk.find(b"\x00")
+            if end != -1:
+                chunks.append(chunk[:end])
+                # go back right after the terminator
+                fh.seek(end + 1 - len(chunk), io.SEEK_CUR)
+                return b"".join(chunks), True
+            chunks.append(chunk)
+
+    def _decode(self, raw: bytes) -> str:
+        try:
+            return raw.decode(self.encoding)
+        except UnicodeDecodeError:
+            if self.fallback_encoding is None:
+                raise
+            logger.debug(f"{raw!r} is not {self.encoding}")
+            return raw.decode(self.fallback_encoding)
+
+
+class StructParser(TypeParser):
+    """
+    Parse a single value described by `layout`. On a `BufferReader` the value is
+    decoded in place with `struct.unpack_from`, without any read.
+    """
 
-        return result.decode("utf-8")
+    layout: struct.Struct
 
+    def parse(self):
+        fh = self.filehandler
+        if isinstance(fh, BufferReader):
+            return fh.unpack(self.layout)[0]
+        return self.layout.unpack(fh.read(self.layout.size))[0]
 
-class UintParser(TypeParser):
+
+class UintParser(StructParser):
     """
     Parse base unisgned int.
     """
 
-    def parse(self) -> int:
-        return struct.unpack("<I", self.filehandler.read(4))[0]
+    layout = struct.Struct("<I")
+
+
+class UShortParser(StructParser):
+    layout = struct.Struct("<H")
 
 
-class UShortParser(TypeParser):
-    def parse(self) -> int:
-        return struct.unpack("<H", self.filehandler.read(2))[0]
+class ULongParser(StructParser):
+    layout = struct.Struct("<Q")
 
 
-class ULongParser(TypeParser):
-    def parse(self) -> int:
-        return struct.unpack("<Q", self.filehandler.read(8))[0]
+class IntParser(StructParser):
+    layout = struct.Struct("<i")
 
 
-class IntParser(TypeParser):
-    def parse(self) -> int:
-        return struct.unpack("<i", self.filehandler.read(4))[0]
+class ShortParser(StructParser):
+    layout = struct.Struct("<h")
 
 
-class ShortParser(TypeParser):
-    def parse(self) -> int:
-        return struct.unpack("<h", self.filehandler.read(2))[0]
+class LongParser(StructParser):
+    layout = struct.Struct("<q")
 
 
-class LongParser(TypeParser):
-    def parse(self) -> int:
-        return struct.unpack("<q", self.filehandler.read(8))[0]
+class FloatParser(StructParser):
+    layout = struct.Struct("<f")
 
 
-class FloatParser(TypeParser):
-    def parse(self) -> float:
-        return struct.unpack("<f", self.filehandler.read(4))[0]
+class DoubleParser(StructParser):
+    layout = struct.Struct("<d")
 
 
-class DoubleParser(TypeParser):
-    def parse(self) -> float:
-        return struct.unpack("<d", self.filehandler.read(8))[0]
+class RecordLayout:
+    """
+    Fixed size record described once as a list of (name, struct format) and
+    compiled in a single little-endian `struct.Struct`, so a whole record is
+    decoded with one read and one unpack.
+    """
+
+    names: Tuple[str, ...]
+    layout: struct.Struct
+
+    def __init__(self, *fields: Tuple[str, str]):
+        self.names = tuple(name for name, _ in fields)
+        self.layout = struct.Struct("<" + "".join(fmt for _, fmt in fields))
+
+    @property
+    def size(self) -> int:
+        return self.layout.size
+
+    def unpack(self, fh: BinaryIO) -> Tuple:
+        if isinstance(fh, BufferReader):
+            return fh.unpack(self.layout)
+        return self.layout.unpack(fh.read(self.layout.size))
+
+    def pack(self, values: Dict[str, Any]) -> bytes:
+        """
+        Encode a record from its fields by name.
+        """
+        return self.layout.pack(*[values[name] for name in self.names])
+
+
+class UShortArrayParser(TypeParser):
+    """
+    Parse `count` consecutive unsigned short with a single read. Return a numpy
+    uint16 array if numpy is installed, an `array("H")` otherwise. On a
+    `BufferReader` nothing is copied: the numpy array (or a memoryview cast to
+    uint16 without numpy) share the memory of the buffer.
+    """
+
+    count: int
+
+    def __init__(self, filehandler: BinaryIO, count: int):
+        super().__init__(filehandler)
+        self.count = count
+
+    def parse(self):
+        size = self.count * 2
+        if isinstance(self.filehandler, BufferReader):
+            raw = self.filehandler.view(size)
+        else:
+            raw = self.filehandler.read(size)
+        if len(raw) != size:
+            raise ValueError(f"Expected {size} bytes of unsigned short, got {len(raw)}")
+        if numpy is not None:
+            return numpy.frombuffer(raw, dtype="<u2")
+        if isinstance(raw, memoryview) and sys.byteorder == "little":
+            # zero copy, the view share the memory of the BufferReader
+            return raw.cast("H")
+        result = array("H")
+        result.frombytes(raw)
+        if sys.byteorder == "big":
+            result.byteswap()
+        return result
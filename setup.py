@@ -44,4 +44,6 @@ setup(
     keywords="SR-4731 reflectometer Telcordia OTDR SOR ",
     packages=find_packages(),
     install_requires=requirements,
+    # numpy is optional: DataPts points are decoded in a numpy array if available.
+    extras_require={"numpy": ["numpy"], "arrow": ["pyarrow"]},
 )
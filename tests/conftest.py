@@ -0,0 +1,31 @@
+"""
+Fixtures of the tests: the sample files of data/ and small synthetic files.
+
+Run with `pytest tests`.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from otdr.file_writer import SorWriter
+from otdr.generator import random_blocks
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+SAMPLE_FILES = sorted(DATA_DIR.glob("*.sor"))
+
+
+@pytest.fixture(params=SAMPLE_FILES, ids=lambda path: path.name)
+def sample_file(request) -> Path:
+    return request.param
+
+
+@pytest.fixture(scope="session")
+def lnk_sor() -> bytes:
+    """
+    A v2 file with a LnkParams block, kept raw by the parser.
+    """
+    return SorWriter(2).dumps(
+        random_blocks(2000, 3, seed=0),
+        [("LnkParams", b"LnkParams\0" + bytes(range(20)))],
+    )
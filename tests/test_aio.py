@@ -0,0 +1,19 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+from otdr.aio import AsyncParser
+from otdr.block_data_structure import ProprietaryBlock
+from otdr.file_parser import ParserFactory
+
+
+def test_parse_in_process_pool(lnk_sor):
+    async def parse():
+        with ProcessPoolExecutor(2) as executor:
+            return await AsyncParser(executor).parse(lnk_sor)
+
+    blocks = asyncio.run(parse())
+
+    expected = ParserFactory.create_parser(lnk_sor).parse()
+    assert [type(b) for b in blocks] == [type(b) for b in expected]
+    lnk_params = next(b for b in blocks if isinstance(b, ProprietaryBlock))
+    assert lnk_params.data == b"LnkParams\0" + bytes(range(20))
@@ -0,0 +1,77 @@
+import io
+import subprocess
+import sys
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from otdr.batch import parse_batch
+from otdr.block_data_structure import KeyEvents, ProprietaryBlock
+from otdr.file_parser import ParserFactory
+
+
+def _blocks(blocks, data_class):
+    return next(b for b in blocks if isinstance(b, data_class))
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_zip_members(tmp_path, lnk_sor, workers):
+    archive = tmp_path / "bundle.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        for i in range(5):
+            zf.writestr(f"site/{i}.sor", lnk_sor)
+
+    results = list(parse_batch([archive], workers=workers, chunksize=2))
+
+    assert [r.source for r in results] == [f"{archive}!site/{i}.sor" for i in range(5)]
+    assert all(r.ok for r in results), [r.error for r in results]
+    expected = ParserFactory.create_parser(lnk_sor).parse()
+    for data_class in (ProprietaryBlock, KeyEvents):
+        assert _blocks(results[-1].blocks, data_class) == _blocks(expected, data_class)
+
+
+def test_zip_members_without_numpy(tmp_path, lnk_sor):
+    # traces are then memoryviews on the member, copied to leave the worker
+    archive = tmp_path / "bundle.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("0.sor", lnk_sor)
+    script = (
+        "import sys; sys.modules['numpy'] = None\n"
+        "from otdr.batch import parse_batch\n"
+        f"results = list(parse_batch([{str(archive)!r}], workers=2))\n"
+        "assert [r.error for r in results] == [None], results\n"
+        "names = [type(b).__name__ for b in results[0].blocks]\n"
+        "points = results[0].blocks[names.index('DataPoints')].points\n"
+        "assert type(points).__name__ == 'array' and len(points) == 2000\n"
+    )
+    root = Path(__file__).parent.parent
+    subprocess.run([sys.executable, "-c", script], cwd=root, check=True)
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_corrupt_archives(tmp_path, sample_file, workers):
+    data = sample_file.read_bytes()
+    bad_zip = tmp_path / "bad.zip"
+    bad_zip.write_text("not an archive\n" * 50)
+    truncated = tmp_path / "truncated.tar"
+    content = io.BytesIO()
+    with tarfile.open(fileobj=content, mode="w") as tf:
+        for i in range(3):
+            info = tarfile.TarInfo(f"{i}.sor")
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    # cut in the middle of the second member
+    truncated.write_bytes(content.getvalue()[: 512 + len(data) + 1024])
+
+    results = list(parse_batch([bad_zip, truncated, sample_file], workers=workers))
+
+    assert [(r.source, r.ok) for r in results] == [
+        (str(bad_zip), False),
+        (f"{truncated}!0.sor", True),
+        (f"{truncated}!1.sor", False),
+        (str(truncated), False),
+        (str(sample_file), True),
+    ]
+    assert results[0].error.startswith("ReadError")
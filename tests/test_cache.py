@@ -0,0 +1,33 @@
+import shutil
+
+from otdr.batch import parse_batch
+from otdr.block_data_structure import ProprietaryBlock
+from otdr.cache import ParseCache
+
+
+def test_eviction_under_max_size(tmp_path):
+    cache = ParseCache(tmp_path, max_size=50_000)
+    keys = [cache.key(None, bytes([i])) for i in range(20)]
+    for i, key in enumerate(keys):
+        cache.put(key, [ProprietaryBlock("Vendor", bytes([i]) * 10_000)])
+        assert cache.size() <= cache.max_size
+
+    # least recently used first
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[-1]) == [ProprietaryBlock("Vendor", bytes([19]) * 10_000)]
+
+
+def test_shared_by_batch_workers(tmp_path, sample_file):
+    sor_files = []
+    for i in range(24):
+        sor_files.append(tmp_path / "sor" / f"{i}.sor")
+        sor_files[-1].parent.mkdir(exist_ok=True)
+        shutil.copy(sample_file, sor_files[-1])
+    max_size = 8 * sample_file.stat().st_size
+    cache = ParseCache(tmp_path / "cache", max_size, key_by="stat")
+
+    for _ in range(2):
+        results = list(parse_batch(sor_files, workers=3, chunksize=2, cache=cache))
+        assert all(r.ok for r in results)
+        assert cache.size() <= max_size
+    assert cache.processes == 1
@@ -0,0 +1,34 @@
+import pytest
+
+from otdr.encoder import blocks_to_plain
+from otdr.file_parser import ParserFactory
+from otdr.file_writer import SorWriter
+from otdr.generator import random_sor
+
+# computed by the writer
+WRITTEN_BLOCKS = ("MapBlock", "Cksum")
+
+
+def _decoded(blocks) -> dict:
+    plain = blocks_to_plain(blocks, True)
+    return {name: value for name, value in plain.items() if name not in WRITTEN_BLOCKS}
+
+
+def test_round_trip(sample_file):
+    parser = ParserFactory.create_parser(sample_file.read_bytes())
+    blocks = parser.parse()
+
+    data = SorWriter(parser.version).dumps(blocks)
+    written = ParserFactory.create_parser(data, checksum="strict")
+
+    assert written.version == parser.version
+    assert _decoded(written.parse()) == _decoded(blocks)
+
+
+@pytest.mark.parametrize("version", [1, 2])
+def test_generated_files_are_written_back_as_is(version):
+    data = random_sor(5000, 8, version, seed=1)
+
+    blocks = ParserFactory.create_parser(data, checksum="strict").parse()
+
+    assert SorWriter(version).dumps(blocks) == data
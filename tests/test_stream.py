@@ -0,0 +1,40 @@
+import os
+import threading
+
+import pytest
+
+from otdr.encoder import blocks_to_plain
+from otdr.file_parser import ParserFactory
+from otdr.stream import StreamParser
+
+
+def _write_by_chunks(fd: int, data: bytes, chunksize: int = 1000) -> None:
+    with open(fd, "wb", buffering=0) as pipe:
+        for start in range(0, len(data), chunksize):
+            pipe.write(data[start : start + chunksize])
+
+
+@pytest.mark.parametrize("checksum", ["off", "lazy"])
+def test_pipe(sample_file, checksum):
+    data = sample_file.read_bytes()
+    read_fd, write_fd = os.pipe()
+    writer = threading.Thread(target=_write_by_chunks, args=(write_fd, data))
+    writer.start()
+    # unbuffered: reads return what the writer has written so far
+    with open(read_fd, "rb", buffering=0) as pipe:
+        blocks = StreamParser(pipe, checksum).parse()
+    writer.join()
+
+    expected = ParserFactory.create_parser(data, checksum=checksum).parse()
+    assert blocks_to_plain(blocks, True) == blocks_to_plain(expected, True)
+
+
+def test_truncated_stream(sample_file):
+    data = sample_file.read_bytes()
+    read_fd, write_fd = os.pipe()
+    writer = threading.Thread(target=_write_by_chunks, args=(write_fd, data[:-100]))
+    writer.start()
+    with open(read_fd, "rb", buffering=0) as pipe:
+        with pytest.raises(ValueError, match="Stream ended"):
+            StreamParser(pipe).parse()
+    writer.join()